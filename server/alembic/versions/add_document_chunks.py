@@ -0,0 +1,31 @@
+"""add document chunk store
+
+Revision ID: add_document_chunks
+Revises: add_chunks_indexed
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+# revision identifiers, used by Alembic.
+revision = 'add_document_chunks'
+down_revision = 'add_chunks_indexed'  # Previous migration
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Compressed chunk text keyed by Qdrant point ID, hydrated after searches
+    op.create_table(
+        'document_chunks',
+        sa.Column('id', UUID(as_uuid=True), primary_key=True),
+        sa.Column('document_id', UUID(as_uuid=True), sa.ForeignKey('documents.id', ondelete='CASCADE'), nullable=False, index=True),
+        sa.Column('chunk_index', sa.Integer, nullable=False),
+        sa.Column('content', sa.LargeBinary, nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('document_chunks')
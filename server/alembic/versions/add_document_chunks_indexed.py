@@ -0,0 +1,24 @@
+"""add ingestion checkpoint to documents
+
+Revision ID: add_chunks_indexed
+Revises: add_content_hash
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_chunks_indexed'
+down_revision = 'add_content_hash'  # Previous migration
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Chunks stored in Qdrant so far; a retried ingestion resumes after them
+    op.add_column('documents', sa.Column('chunks_indexed', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'chunks_indexed')
@@ -0,0 +1,26 @@
+"""add content hash to documents
+
+Revision ID: add_content_hash
+Revises: add_async_chat
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_content_hash'
+down_revision = 'add_async_chat'  # Previous migration
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SHA-256 of the uploaded bytes, used to reuse embeddings for duplicate uploads
+    op.add_column('documents', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.create_index('ix_documents_content_hash', 'documents', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_content_hash', table_name='documents')
+    op.drop_column('documents', 'content_hash')
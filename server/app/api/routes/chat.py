@@ -3,18 +3,20 @@ Chat Routes
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.api.dependencies import get_current_user_id
 from app.schemas.chat import ChatRequest, ChatResponse, ChatSource
 from app.services.chat_service import ChatService
+from app.utils.embeddings import generate_embedding_async
 
 router = APIRouter()
 
 
 @router.post("/", response_model=ChatResponse)
-def chat(
+async def chat(
     request: ChatRequest,
     db: Session = Depends(get_db),
     user_id: str = Depends(get_current_user_id)
@@ -35,12 +37,18 @@ def chat(
     Provide conversation_id to maintain conversation continuity.
     """
     try:
-        result = ChatService.chat(
+        # Embed the query on the shared async client, then run the blocking
+        # search/answer/store steps off the event loop
+        query_embedding = await generate_embedding_async(request.query)
+        
+        result = await run_in_threadpool(
+            ChatService.chat,
             db=db,
             user_id=user_id,
             query=request.query,
             document_id=None,  # Can be added to request if needed
-            conversation_id=request.conversation_id
+            conversation_id=request.conversation_id,
+            query_embedding=query_embedding
         )
         
         # Format response
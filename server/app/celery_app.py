@@ -3,7 +3,9 @@ Celery Configuration
 Async task processing with Redis broker
 """
 
-from celery import Celery
+import os
+
+from celery import Celery, signals
 from app.config import settings
 
 # Create Celery app
@@ -26,5 +28,28 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes soft limit
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    worker_concurrency=settings.CELERY_WORKER_CONCURRENCY or None,  # None: CPU count
 )
 
+
+# Pool size of the worker this process belongs to; set in the worker's main
+# process before the pool forks, so pool processes inherit it
+_worker_concurrency = 0
+
+
+@signals.worker_init.connect
+def _record_worker_concurrency(sender=None, **kwargs):
+    """Remember the resolved pool size (-c, worker_concurrency or CPU count)"""
+    global _worker_concurrency
+    _worker_concurrency = sender.concurrency
+
+
+def get_worker_concurrency() -> int:
+    """
+    Get the pool size of the running Celery worker
+    
+    Returns:
+        Number of pool processes, the configured concurrency (or CPU count)
+        outside a started worker
+    """
+    return _worker_concurrency or celery_app.conf.worker_concurrency or os.cpu_count() or 1
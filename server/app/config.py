@@ -34,12 +34,35 @@ class Settings(BaseSettings):
     # Qdrant
     QDRANT_HOST: str = "localhost"
     QDRANT_PORT: int = 6333
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = False  # Talk to Qdrant over gRPC instead of REST
+    QDRANT_COLLECTION_CACHE_TTL: float = 300.0  # Seconds a collection is trusted to exist without asking Qdrant
+    QDRANT_COLLECTION_LAYOUT: str = "per_user"  # per_user (one collection per user) | shared (tenant-filtered)
+    QDRANT_SHARED_COLLECTION: str = "documents"  # Shared collection name (shared layout)
+    QDRANT_SHARED_COLLECTION_SHARDS: int = 1  # Spread users over this many shared collections
+    QDRANT_UPSERT_BATCH_SIZE: int = 256  # Points per upsert request
+    QDRANT_UPSERT_PARALLELISM: int = 4  # Upsert requests in flight per upload
+    QDRANT_UPSERT_WAIT: bool = True  # Wait for points to be indexed before each request returns
+    QDRANT_COLLECTION_PROFILE: str = "default"  # Key of QDRANT_COLLECTION_PROFILES used for new collections
+    QDRANT_COLLECTION_PROFILES: dict = {
+        # In-memory float vectors
+        "default": {"hnsw_m": 16, "hnsw_ef_construct": 100, "on_disk": False, "quantization": None},
+        # Denser graph, int8 vectors in RAM rescored with the originals
+        "fast": {"hnsw_m": 32, "hnsw_ef_construct": 200, "on_disk": False, "quantization": "int8", "oversampling": 2.0},
+        # Float vectors on disk, int8 copies in RAM (about 4x less memory)
+        "compact": {"hnsw_m": 16, "hnsw_ef_construct": 100, "on_disk": True, "quantization": "int8", "oversampling": 3.0},
+    }
     
     # OpenAI
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
     
+    # Embeddings
+    EMBEDDING_PROVIDER: str = "openai"  # openai | local (offline hashing embedder)
+    EMBEDDING_DIMENSIONS: int = 0  # Shortened OpenAI output size, e.g. 512 (0 = model native)
+    LOCAL_EMBEDDING_DIMENSION: int = 512
+    
     # JWT
     JWT_SECRET_KEY: str = "change-this-secret-key-in-production"
     JWT_ALGORITHM: str = "HS256"
@@ -48,9 +71,40 @@ class Settings(BaseSettings):
     # File Upload
     UPLOAD_DIR: str = "./data/uploads"
     MAX_FILE_SIZE: int = 10485760  # 10MB
+    UPLOAD_BLOCK_SIZE: int = 1048576  # 1MB read/write block for streamed uploads
+    TEXT_CACHE_DIR: str = "./data/text_cache"  # Extracted text, keyed by content hash
+    TEXT_CACHE_ENABLED: bool = True
+    TEXT_CACHE_MAX_SIZE_MB: int = 1024  # Least recently used entries are evicted beyond this (0 = unlimited)
+    TEXT_CACHE_MAX_AGE_DAYS: int = 30  # Entries unused for this long are evicted (0 = never)
     ALLOWED_EXTENSIONS: str = ".pdf,.txt,.docx,.md,.csv,.json"
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    CHUNK_UNIT: str = "characters"  # characters | tokens
+    CHUNK_TOKEN_SIZE: int = 256  # Tokens per chunk when CHUNK_UNIT=tokens
+    CHUNK_TOKEN_OVERLAP: int = 32  # Token overlap when CHUNK_UNIT=tokens
+    PDF_PARALLEL_PAGE_THRESHOLD: int = 50  # Extract PDFs with this many pages in a process pool
+    PDF_PARSE_WORKERS: int = 0  # Processes for parallel PDF extraction (0 = CPU count, capped per Celery worker process)
+    EMBEDDING_BATCH_SIZE: int = 500  # Chunks embedded and stored per batch during ingestion
+    CHUNK_TEXT_STORE: str = "postgres"  # postgres (compressed, hydrated after search) | payload (in Qdrant)
+    CHUNK_STORE_COMPRESSION_LEVEL: int = 6  # zlib level (1-9) for stored chunk text; zlib (stdlib) instead of zstd, no extra dependency
+    DOCUMENT_TASK_MAX_RETRIES: int = 3  # Retries of a failed ingestion, resuming from its last stored batch
+    DOCUMENT_TASK_RETRY_DELAY: int = 30  # Seconds before the first retry (doubles each time)
+    EMBEDDING_REQUEST_MAX_INPUTS: int = 2048  # Inputs per embeddings API request
+    EMBEDDING_REQUEST_MAX_TOKENS: int = 50000  # Tokens per embeddings API request
+    EMBEDDING_CONCURRENCY: int = 4  # Embedding requests in flight per call
+    EMBEDDING_MAX_RETRIES: int = 3  # Retries per request on rate limit / transient errors
+    EMBEDDING_RATE_LIMIT_RPM: int = 0  # Embedding requests per minute across all workers (0 = unlimited)
+    EMBEDDING_RATE_LIMIT_TPM: int = 0  # Embedding tokens per minute across all workers (0 = unlimited)
+    EMBEDDING_RATE_HEADROOM: float = 0.9  # Fraction of the limits actually used
+    EMBEDDING_RATE_BURST_SECONDS: float = 5.0  # Refill the buckets can hold, in seconds
+    EMBEDDING_ASYNC_CONCURRENCY: int = 16  # Async embedding requests in flight per process
+    EMBEDDING_HTTP_MAX_CONNECTIONS: int = 20  # Pooled keep-alive connections to the embeddings API
+    EMBEDDING_HTTP_KEEPALIVE_EXPIRY: float = 60.0  # Seconds an idle pooled connection is kept
+    EMBEDDING_CACHE_BACKEND: str = "redis"  # none | memory | redis (in-process LRU + Redis)
+    EMBEDDING_CACHE_MEMORY_MB: int = 64  # Size limit of the in-process LRU tier
+    EMBEDDING_CACHE_TTL: int = 604800  # Redis entry expiry (seconds, 7 days)
+    EMBEDDING_SINGLE_FLIGHT: str = "process"  # none | process | redis (also coalesce across processes)
+    EMBEDDING_SINGLE_FLIGHT_TIMEOUT: float = 30.0  # Max seconds to wait for another caller's embedding
     
     @property
     def allowed_extensions_list(self) -> List[str]:
@@ -61,6 +115,7 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: str = ""
+    CELERY_WORKER_CONCURRENCY: int = 0  # Celery pool processes per worker (0 = CPU count)
     
     @property
     def REDIS_URL(self) -> str:
@@ -6,6 +6,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
+from app.middleware.upload_limit import UploadSizeLimitMiddleware
+from app.utils.embeddings import close_embedding_clients
 
 # Create FastAPI app
 app = FastAPI(
@@ -25,6 +27,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Refuse oversized uploads before their body is received
+app.add_middleware(UploadSizeLimitMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -36,6 +41,12 @@ async def root():
     }
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Close pooled connections held for the lifetime of the app"""
+    await close_embedding_clients()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
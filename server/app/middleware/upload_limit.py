@@ -0,0 +1,50 @@
+"""
+Upload Size Limit Middleware
+Reject oversized uploads from their Content-Length before the body is read
+"""
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+
+
+# Room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Answer 413 to upload requests declaring a body larger than MAX_FILE_SIZE
+    
+    FastAPI parses (and spools) the whole multipart body before the route
+    runs, so this is the only place an oversized upload can be refused
+    without receiving it. Requests without Content-Length (chunked) are
+    passed through and limited by DocumentService.save_file instead.
+    """
+    
+    def __init__(self, app: ASGIApp, path_prefix: str = "/api/upload"):
+        self.app = app
+        self.path_prefix = path_prefix
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"].startswith(self.path_prefix)
+        ):
+            content_length = dict(scope["headers"]).get(b"content-length")
+            if (
+                content_length
+                and content_length.isdigit()
+                and int(content_length) > settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+            ):
+                response = JSONResponse(
+                    status_code=413,
+                    content={"detail": f"File too large. Maximum size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"},
+                    headers={"Connection": "close"}
+                )
+                await response(scope, receive, send)
+                return
+        
+        await self.app(scope, receive, send)
@@ -5,6 +5,7 @@ Database Models
 from app.models.user import User
 from app.models.document import Document
 from app.models.chat_history import ChatHistory
+from app.models.document_chunk import DocumentChunk
 
-__all__ = ["User", "Document", "ChatHistory"]
+__all__ = ["User", "Document", "ChatHistory", "DocumentChunk"]
 
@@ -2,7 +2,7 @@
 Document Model
 """
 
-from sqlalchemy import Column, String, DateTime, BigInteger, ForeignKey
+from sqlalchemy import Column, String, DateTime, BigInteger, Integer, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -24,6 +24,7 @@ class Document(Base):
     file_path = Column(String(512), nullable=False)
     file_size = Column(BigInteger, nullable=False)  # Size in bytes
     mime_type = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of file content, for deduplication
     
     # Qdrant collection for this document's embeddings
     vector_collection_id = Column(String(255), nullable=True)
@@ -32,6 +33,7 @@ class Document(Base):
     processing_status = Column(String(50), default="pending", nullable=False)  # pending, processing, completed, failed
     processing_error = Column(String(512), nullable=True)
     task_id = Column(String(255), nullable=True)  # Celery task ID
+    chunks_indexed = Column(Integer, default=0, server_default="0", nullable=False)  # Checkpoint for resuming ingestion
     
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
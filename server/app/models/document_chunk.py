@@ -0,0 +1,23 @@
+"""
+Document Chunk Model
+"""
+
+from sqlalchemy import Column, Integer, LargeBinary, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+
+
+class DocumentChunk(Base):
+    """
+    Text of a document chunk, kept out of the Qdrant payload
+    """
+    __tablename__ = "document_chunks"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)  # Qdrant point ID of the chunk
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    content = Column(LargeBinary, nullable=False)  # zlib-compressed UTF-8 chunk text
+
+    def __repr__(self):
+        return f"<DocumentChunk(id={self.id}, document_id={self.document_id}, chunk_index={self.chunk_index})>"
@@ -22,9 +22,11 @@ class DocumentResponse(BaseModel):
     filename: str
     file_size: int
     mime_type: Optional[str]
+    content_hash: Optional[str] = None
     vector_collection_id: Optional[str]
     processing_status: str  # pending, processing, completed, failed
     processing_error: Optional[str]
+    chunks_indexed: int = 0
     task_id: Optional[str]
     uploaded_at: datetime
     
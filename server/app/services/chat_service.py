@@ -131,7 +131,8 @@ class ChatService:
         user_id: str,
         query: str,
         document_id: Optional[str] = None,
-        conversation_id: Optional[str] = None
+        conversation_id: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> dict:
         """
         Complete RAG chat pipeline WITH CHAT HISTORY
@@ -142,12 +143,14 @@ class ChatService:
             query: User's question
             document_id: Optional document ID to search in
             conversation_id: Optional conversation ID for grouping messages
+            query_embedding: Embedding of the query if already computed
             
         Returns:
             Dict with answer, sources, and conversation_id
         """
         # Generate embedding for query
-        query_embedding = generate_embedding(query)
+        if query_embedding is None:
+            query_embedding = generate_embedding(query)
         
         # 1. Search both documents AND chat history
         combined_results = QdrantService.search_combined(
@@ -5,13 +5,16 @@ Handle document upload, processing, and storage
 
 import os
 import uuid
+import hashlib
 from pathlib import Path
+from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import UploadFile, HTTPException, status
 
 from app.models.document import Document
 from app.config import settings
-from app.utils.file_parser import FileParser, chunk_text
+from app.utils.file_parser import iter_document_chunks
+from app.utils import text_cache
 from app.utils.embeddings import generate_embeddings
 from app.services.qdrant_service import QdrantService
 
@@ -45,16 +48,26 @@ class DocumentService:
             )
     
     @staticmethod
-    async def save_file(file: UploadFile, user_id: str) -> tuple[str, int]:
+    async def save_file(file: UploadFile, user_id: str) -> tuple[str, int, str]:
         """
-        Save uploaded file to disk
+        Stream uploaded file to disk in fixed-size blocks
+        
+        The upload is never held in memory as a whole: each block is hashed
+        and written as it is read, and the copy is aborted (and the partial
+        file removed) as soon as the running size passes MAX_FILE_SIZE.
+        
+        By the time this runs the request body has already been received and
+        spooled by the multipart parser; requests declaring an oversized body
+        are refused earlier by UploadSizeLimitMiddleware. The check here
+        covers uploads sent without Content-Length.
         
         Args:
             file: Uploaded file
             user_id: User ID
             
         Returns:
-            Tuple of (file_path, file_size)
+            Tuple of (file_path, file_size, content_hash) where content_hash
+            is the hex SHA-256 digest of the file content
         """
         # Create user directory
         user_dir = Path(settings.UPLOAD_DIR) / str(user_id)
@@ -66,21 +79,35 @@ class DocumentService:
         safe_filename = f"{file_id}{ext}"
         file_path = user_dir / safe_filename
         
-        # Save file
-        content = await file.read()
-        file_size = len(content)
-        
-        # Check file size
-        if file_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
-            )
+        # Save file block by block
+        digest = hashlib.sha256()
+        file_size = 0
         
-        with open(file_path, 'wb') as f:
-            f.write(content)
+        try:
+            with open(file_path, 'wb') as f:
+                while True:
+                    block = await file.read(settings.UPLOAD_BLOCK_SIZE)
+                    if not block:
+                        break
+                    
+                    file_size += len(block)
+                    
+                    # Check file size before touching the disk
+                    if file_size > settings.MAX_FILE_SIZE:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE / 1024 / 1024}MB"
+                        )
+                    
+                    digest.update(block)
+                    f.write(block)
+        except BaseException:
+            # Don't leave partial uploads behind
+            if file_path.exists():
+                file_path.unlink()
+            raise
         
-        return str(file_path), file_size
+        return str(file_path), file_size, digest.hexdigest()
     
     @staticmethod
     def parse_and_chunk_document(file_path: str) -> list[str]:
@@ -94,19 +121,12 @@ class DocumentService:
             List of text chunks
         """
         try:
-            # Parse file
-            text = FileParser.parse_file(file_path)
+            # Parse and split into chunks as a stream
+            chunks = [chunk for chunk, _ in iter_document_chunks(file_path)]
             
-            if not text:
+            if not chunks:
                 raise ValueError("No text extracted from document")
             
-            # Split into chunks
-            chunks = chunk_text(
-                text,
-                chunk_size=settings.CHUNK_SIZE,
-                chunk_overlap=settings.CHUNK_OVERLAP
-            )
-            
             return chunks
         except Exception as e:
             raise HTTPException(
@@ -138,7 +158,7 @@ class DocumentService:
         DocumentService.validate_file(file)
         
         # Save file
-        file_path, file_size = await DocumentService.save_file(file, user_id)
+        file_path, file_size, content_hash = await DocumentService.save_file(file, user_id)
         
         # Create document record with pending status
         document = Document(
@@ -147,6 +167,7 @@ class DocumentService:
             file_path=file_path,
             file_size=file_size,
             mime_type=file.content_type,
+            content_hash=content_hash,
             processing_status="pending"
         )
         
@@ -169,6 +190,31 @@ class DocumentService:
         
         return document, task.id
     
+    @staticmethod
+    def find_indexed_duplicate(db: Session, document: Document) -> Optional[Document]:
+        """
+        Find an already indexed document of the same user with the same content
+        
+        Only the uploader's own documents are considered, so reuse never
+        reveals whether another user has uploaded the same file.
+        
+        Args:
+            db: Database session
+            document: Document to look up by content hash
+            
+        Returns:
+            A completed document of the same user with identical content, or None
+        """
+        if not document.content_hash:
+            return None
+        
+        return db.query(Document).filter(
+            Document.user_id == document.user_id,
+            Document.content_hash == document.content_hash,
+            Document.processing_status == "completed",
+            Document.id != document.id
+        ).order_by(Document.uploaded_at.desc()).first()
+    
     @staticmethod
     def get_user_documents(db: Session, user_id: str) -> list[Document]:
         """
@@ -225,6 +271,16 @@ class DocumentService:
         except Exception as e:
             print(f"Error deleting file: {e}")
         
+        # Delete cached extracted text unless another document has the same content
+        try:
+            if document.content_hash and not db.query(Document.id).filter(
+                Document.content_hash == document.content_hash,
+                Document.id != document.id
+            ).first():
+                text_cache.remove_entries(document.content_hash)
+        except Exception as e:
+            print(f"Error deleting cached text: {e}")
+        
         # Delete from database
         db.delete(document)
         db.commit()
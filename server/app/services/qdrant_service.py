@@ -3,19 +3,103 @@ Qdrant Service
 Handle vector database operations
 """
 
-from typing import List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, List, Optional
 from uuid import UUID, uuid4
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+from qdrant_client.models import PointStruct, FieldCondition, MatchValue, SearchRequest
 
 from app.config import settings
-from app.utils.embeddings import get_embedding_dimension
-from app.utils.qdrant_client import get_qdrant_client, get_collection_name
+from app.utils import chunk_store
+from app.utils.embeddings import get_embedding_dimension, generate_embeddings
+from app.utils.qdrant_client import (
+    get_qdrant_client,
+    get_collection_name,
+    get_tenant_filter,
+    get_chunk_point_id,
+    get_search_params,
+    create_collection,
+    create_collection_if_not_exists,
+    get_collection_vector_size,
+    collection_registry
+)
+
+
+# Payload fields returned by searches (chunk_text and filename only exist on
+# points stored before the chunk store; newer chunks are hydrated from it)
+DOCUMENT_RESULT_FIELDS = ["document_id", "filename", "chunk_index", "chunk_text", "token_count"]
+CHAT_RESULT_FIELDS = ["chat_id", "text", "conversation_id"]
+
+# Chat history points are tagged with this; document chunks have no type
+CHAT_HISTORY_TYPE = FieldCondition(key="type", match=MatchValue(value="chat_history"))
 
 
 class QdrantService:
     """Service for Qdrant vector database operations"""
     
+    @staticmethod
+    def _chunk_payload(
+        user_id: str,
+        document_id: UUID,
+        chunk_index: int,
+        chunk: str,
+        token_count: Optional[int],
+        filename: str
+    ) -> dict:
+        """
+        Build the payload of a document chunk point
+        
+        With the chunk store enabled the payload keeps only what searches
+        filter or sort on; text and filename are looked up after the search.
+        """
+        payload = {
+            "document_id": str(document_id),
+            "chunk_index": chunk_index,
+            "token_count": token_count
+        }
+        if not chunk_store.is_enabled():
+            payload.update({"user_id": str(user_id), "chunk_text": chunk, "filename": filename})
+        elif settings.QDRANT_COLLECTION_LAYOUT == "shared":
+            payload["user_id"] = str(user_id)
+        return payload
+    
+    @staticmethod
+    def _load_texts(records: list) -> List[str]:
+        """Get the chunk or chat text of scrolled records, from the payload or the chunk store"""
+        stored = chunk_store.get_chunks([
+            str(record.id) for record in records
+            if "chunk_text" not in record.payload and "text" not in record.payload
+        ])
+        return [
+            record.payload.get("chunk_text")
+            or record.payload.get("text")
+            or stored.get(str(record.id), {}).get("chunk_text", "")
+            for record in records
+        ]
+    
+    @staticmethod
+    def _format_document_results(results: list) -> List[dict]:
+        """Format document hits, hydrating chunk text and filename in one query"""
+        stored = chunk_store.get_chunks([str(result.id) for result in results if "chunk_text" not in result.payload])
+        
+        formatted_results = []
+        for result in results:
+            chunk = stored.get(str(result.id), result.payload)
+            if "chunk_text" not in chunk:
+                # Point without stored text (document being deleted)
+                continue
+            formatted_results.append({
+                "document_id": result.payload["document_id"],
+                "filename": chunk["filename"],
+                "chunk_index": result.payload["chunk_index"],
+                "chunk_text": chunk["chunk_text"],
+                "token_count": result.payload.get("token_count"),
+                "similarity_score": result.score
+            })
+        return formatted_results
+    
     @staticmethod
     def create_user_collection(user_id: str) -> str:
         """
@@ -27,27 +111,201 @@ class QdrantService:
         Returns:
             Collection name
         """
-        client = get_qdrant_client()
         collection_name = get_collection_name(user_id)
         
         try:
-            # Check if collection exists
-            collections = client.get_collections()
-            existing_collections = [col.name for col in collections.collections]
+            create_collection_if_not_exists(collection_name, get_embedding_dimension())
+            return collection_name
+        except Exception as e:
+            raise ValueError(f"Error creating collection: {str(e)}")
+    
+    @staticmethod
+    def get_collection_dimension(user_id: str) -> Optional[int]:
+        """
+        Get the vector size of a user's collection
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            Vector size, or None if the collection does not exist
+        """
+        return get_collection_vector_size(get_collection_name(user_id))
+    
+    @staticmethod
+    def reindex_user_collection(user_id: str, batch_size: int = 256) -> int:
+        """
+        Re-embed a user's collection at the current embedding dimension
+        
+        Chunk and chat texts are re-embedded from the stored payloads into a
+        temporary collection, which then replaces the original (keeping point
+        IDs and payloads). Searches return no results while the final copy
+        runs. In the shared layout this re-embeds the whole shared collection,
+        so later calls for its other users return 0.
+        
+        The original is only dropped once every point is in the temporary
+        collection, and an interrupted run is resumed from the temporary
+        collection: points already re-embedded are skipped, and a copy back
+        that did not finish is completed before the temporary is deleted.
+        
+        Args:
+            user_id: User ID
+            batch_size: Points re-embedded and written per request
             
-            if collection_name not in existing_collections:
-                # Create collection
-                client.create_collection(
-                    collection_name=collection_name,
-                    vectors_config=VectorParams(
-                        size=get_embedding_dimension(),
-                        distance=Distance.COSINE
+        Returns:
+            Number of points re-indexed (0 if already at the current dimension)
+        """
+        client = get_qdrant_client()
+        collection_name = get_collection_name(user_id)
+        temp_name = f"{collection_name}_reindex"
+        dimension = get_embedding_dimension()
+        
+        current = get_collection_vector_size(collection_name)
+        temp_dimension = get_collection_vector_size(temp_name)
+        if temp_dimension != dimension and (current is None or current == dimension):
+            return 0
+        
+        try:
+            if current is not None and current != dimension:
+                # 1. Re-embed into a temporary collection, resuming an interrupted run
+                if temp_dimension != dimension:
+                    create_collection(temp_name, dimension, recreate=temp_dimension is not None)
+                
+                offset = None
+                while True:
+                    records, offset = client.scroll(
+                        collection_name=collection_name,
+                        limit=batch_size,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=False
                     )
+                    
+                    done = {
+                        point.id for point in client.retrieve(
+                            collection_name=temp_name,
+                            ids=[record.id for record in records],
+                            with_payload=False,
+                            with_vectors=False
+                        )
+                    } if records else set()
+                    records = [record for record in records if record.id not in done]
+                    
+                    if records:
+                        texts = QdrantService._load_texts(records)
+                        token_counts = [record.payload.get("token_count") for record in records]
+                        embeddings = generate_embeddings(
+                            texts,
+                            token_counts=token_counts if None not in token_counts else None
+                        )
+                        client.upsert(
+                            collection_name=temp_name,
+                            points=[
+                                PointStruct(id=record.id, vector=embedding, payload=record.payload)
+                                for record, embedding in zip(records, embeddings)
+                            ]
+                        )
+                    
+                    if offset is None:
+                        break
+                
+                # Verify before dropping anything
+                source_count = client.count(collection_name=collection_name, exact=True).count
+                temp_count = client.count(collection_name=temp_name, exact=True).count
+                if temp_count < source_count:
+                    raise ValueError(f"Only {temp_count} of {source_count} points re-embedded into {temp_name}")
+                
+                # 2. Replace the original collection
+                create_collection(collection_name, dimension, recreate=True)
+            elif current is None:
+                # Interrupted between dropping and re-creating the original
+                create_collection(collection_name, dimension)
+            
+            # 3. Copy back (point IDs are kept, so a repeated copy is harmless)
+            reindexed = 0
+            offset = None
+            while True:
+                records, offset = client.scroll(
+                    collection_name=temp_name,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
                 )
+                
+                if records:
+                    client.upsert(
+                        collection_name=collection_name,
+                        points=[
+                            PointStruct(id=record.id, vector=record.vector, payload=record.payload)
+                            for record in records
+                        ]
+                    )
+                    reindexed += len(records)
+                
+                if offset is None:
+                    break
             
-            return collection_name
+            client.delete_collection(collection_name=temp_name)
+            collection_registry.forget(temp_name)
+            
+            return reindexed
         except Exception as e:
-            raise ValueError(f"Error creating collection: {str(e)}")
+            raise ValueError(f"Error re-indexing collection: {str(e)}")
+    
+    @staticmethod
+    def upsert_points(
+        collection_name: str,
+        points: Iterable[PointStruct],
+        progress_callback: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """
+        Upload points in batches with several requests in flight
+        
+        Points are consumed lazily, so at most QDRANT_UPSERT_PARALLELISM
+        batches of QDRANT_UPSERT_BATCH_SIZE points are held in memory. With
+        QDRANT_UPSERT_WAIT=false requests return once Qdrant has accepted the
+        batch instead of after it is indexed.
+        
+        Args:
+            collection_name: Target collection
+            points: Points to upsert
+            progress_callback: Called with the number of points stored so far
+                after each batch completes
+            
+        Returns:
+            Number of points stored
+        """
+        client = get_qdrant_client()
+        parallelism = max(1, settings.QDRANT_UPSERT_PARALLELISM)
+        points = iter(points)
+        stored = 0
+        
+        def send(batch: List[PointStruct]) -> int:
+            client.upsert(
+                collection_name=collection_name,
+                points=batch,
+                wait=settings.QDRANT_UPSERT_WAIT
+            )
+            return len(batch)
+        
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            in_flight = deque()
+            
+            while True:
+                batch = list(islice(points, settings.QDRANT_UPSERT_BATCH_SIZE))
+                if batch:
+                    in_flight.append(executor.submit(send, batch))
+                
+                # Wait for the oldest request when the pipeline is full or drained
+                if in_flight and (len(in_flight) >= parallelism or not batch):
+                    stored += in_flight.popleft().result()
+                    if progress_callback:
+                        progress_callback(stored)
+                elif not batch:
+                    break
+        
+        return stored
     
     @staticmethod
     def store_document_embeddings(
@@ -55,7 +313,10 @@ class QdrantService:
         document_id: UUID,
         chunks: List[str],
         embeddings: List[List[float]],
-        filename: str
+        filename: str,
+        start_index: int = 0,
+        token_counts: Optional[List[int]] = None,
+        progress_callback: Optional[Callable[[int], None]] = None
     ) -> None:
         """
         Store document chunk embeddings in Qdrant
@@ -66,38 +327,126 @@ class QdrantService:
             chunks: Text chunks
             embeddings: Embedding vectors
             filename: Original filename
+            start_index: Chunk index of the first chunk (for batched storage)
+            token_counts: Optional token count of each chunk
+            progress_callback: Called with the number of chunks stored so far
         """
-        client = get_qdrant_client()
         collection_name = get_collection_name(user_id)
         
         # Ensure collection exists
         QdrantService.create_user_collection(user_id)
         
         try:
-            # Create points for each chunk
-            points = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                point = PointStruct(
-                    id=str(uuid4()),  # Unique UUID for each chunk
+            if token_counts is None:
+                token_counts = [None] * len(chunks)
+            
+            # Store text first so every searchable point can be hydrated
+            if chunk_store.is_enabled():
+                chunk_store.store_chunks([
+                    (get_chunk_point_id(document_id, i), str(document_id), i, chunk)
+                    for i, chunk in enumerate(chunks, start_index)
+                ])
+            
+            # Create points for each chunk as they are uploaded
+            points = (
+                PointStruct(
+                    id=get_chunk_point_id(document_id, i),  # Idempotent across retries
                     vector=embedding,
-                    payload={
-                        "user_id": user_id,
-                        "document_id": str(document_id),
-                        "chunk_index": i,
-                        "chunk_text": chunk,
-                        "filename": filename
-                    }
+                    payload=QdrantService._chunk_payload(user_id, document_id, i, chunk, token_count, filename)
                 )
-                points.append(point)
-            
-            # Upsert points in batch
-            client.upsert(
-                collection_name=collection_name,
-                points=points
+                for i, (chunk, embedding, token_count) in enumerate(zip(chunks, embeddings, token_counts), start_index)
             )
+            
+            QdrantService.upsert_points(collection_name, points, progress_callback)
         except Exception as e:
             raise ValueError(f"Error storing embeddings: {str(e)}")
     
+    @staticmethod
+    def copy_document_embeddings(
+        source_user_id: str,
+        source_document_id: UUID,
+        target_user_id: str,
+        target_document_id: UUID,
+        filename: str,
+        batch_size: int = 256
+    ) -> int:
+        """
+        Copy the chunk embeddings of an indexed document to another document
+        
+        Used to reuse vectors for duplicate uploads instead of re-embedding.
+        
+        Args:
+            source_user_id: Owner of the already indexed document
+            source_document_id: Already indexed document ID
+            target_user_id: Owner of the new document
+            target_document_id: New document ID
+            filename: Original filename of the new document
+            batch_size: Number of points read per request
+            
+        Returns:
+            Number of chunks copied
+        """
+        client = get_qdrant_client()
+        source_collection = get_collection_name(source_user_id)
+        target_collection = get_collection_name(target_user_id)
+        
+        # Ensure collection exists
+        QdrantService.create_user_collection(target_user_id)
+        
+        try:
+            source_filter = get_tenant_filter(
+                source_user_id,
+                FieldCondition(
+                    key="document_id",
+                    match=MatchValue(value=str(source_document_id))
+                )
+            )
+            
+            def copied_points():
+                offset = None
+                while True:
+                    records, offset = client.scroll(
+                        collection_name=source_collection,
+                        scroll_filter=source_filter,
+                        limit=batch_size,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=True
+                    )
+                    
+                    texts = QdrantService._load_texts(records)
+                    point_ids = [
+                        get_chunk_point_id(target_document_id, record.payload["chunk_index"])
+                        for record in records
+                    ]
+                    
+                    if chunk_store.is_enabled():
+                        chunk_store.store_chunks([
+                            (point_id, str(target_document_id), record.payload["chunk_index"], text)
+                            for point_id, record, text in zip(point_ids, records, texts)
+                        ])
+                    
+                    for point_id, record, text in zip(point_ids, records, texts):
+                        yield PointStruct(
+                            id=point_id,
+                            vector=record.vector,
+                            payload=QdrantService._chunk_payload(
+                                target_user_id,
+                                target_document_id,
+                                record.payload["chunk_index"],
+                                text,
+                                record.payload.get("token_count"),
+                                filename
+                            )
+                        )
+                    
+                    if offset is None:
+                        break
+            
+            return QdrantService.upsert_points(target_collection, copied_points())
+        except Exception as e:
+            raise ValueError(f"Error copying embeddings: {str(e)}")
+    
     @staticmethod
     def search_similar_chunks(
         user_id: str,
@@ -122,37 +471,29 @@ class QdrantService:
         
         try:
             # Build filter
-            query_filter = None
+            conditions = []
             if document_id:
-                query_filter = Filter(
-                    must=[
-                        FieldCondition(
-                            key="document_id",
-                            match=MatchValue(value=document_id)
-                        )
-                    ]
+                conditions.append(
+                    FieldCondition(
+                        key="document_id",
+                        match=MatchValue(value=document_id)
+                    )
                 )
+            # Document chunks only: chat history shares the collection
+            query_filter = get_tenant_filter(user_id, *conditions, must_not=[CHAT_HISTORY_TYPE])
             
             # Search
             results = client.search(
                 collection_name=collection_name,
                 query_vector=query_embedding,
                 limit=limit,
-                query_filter=query_filter
+                query_filter=query_filter,
+                with_payload=DOCUMENT_RESULT_FIELDS,
+                search_params=get_search_params()
             )
             
             # Format results
-            formatted_results = []
-            for result in results:
-                formatted_results.append({
-                    "document_id": result.payload["document_id"],
-                    "filename": result.payload["filename"],
-                    "chunk_index": result.payload["chunk_index"],
-                    "chunk_text": result.payload["chunk_text"],
-                    "similarity_score": result.score
-                })
-            
-            return formatted_results
+            return QdrantService._format_document_results(results)
         except Exception as e:
             raise ValueError(f"Error searching: {str(e)}")
     
@@ -172,13 +513,12 @@ class QdrantService:
             # Delete points with matching document_id
             client.delete(
                 collection_name=collection_name,
-                points_selector=Filter(
-                    must=[
-                        FieldCondition(
-                            key="document_id",
-                            match=MatchValue(value=str(document_id))
-                        )
-                    ]
+                points_selector=get_tenant_filter(
+                    user_id,
+                    FieldCondition(
+                        key="document_id",
+                        match=MatchValue(value=str(document_id))
+                    )
                 )
             )
         except Exception as e:
@@ -217,7 +557,7 @@ class QdrantService:
                 id=vector_id,
                 vector=embedding,
                 payload={
-                    "user_id": user_id,
+                    "user_id": str(user_id),
                     "chat_id": str(chat_id),
                     "conversation_id": str(conversation_id) if conversation_id else None,
                     "text": conversation_text,
@@ -263,40 +603,38 @@ class QdrantService:
             doc_limit = max(1, int(limit * document_weight))
             chat_limit = max(1, int(limit * chat_weight))
             
-            # Search all results
-            all_results = client.search(
+            # One round-trip: a document-only and a chat-only search, each
+            # with its own limit and just the payload fields it returns
+            document_hits, chat_hits = client.search_batch(
                 collection_name=collection_name,
-                query_vector=query_embedding,
-                limit=limit * 2  # Get more to separate later
+                requests=[
+                    SearchRequest(
+                        vector=query_embedding,
+                        filter=get_tenant_filter(user_id, must_not=[CHAT_HISTORY_TYPE]),
+                        limit=doc_limit,
+                        with_payload=DOCUMENT_RESULT_FIELDS,
+                        params=get_search_params()
+                    ),
+                    SearchRequest(
+                        vector=query_embedding,
+                        filter=get_tenant_filter(user_id, CHAT_HISTORY_TYPE),
+                        limit=chat_limit,
+                        with_payload=CHAT_RESULT_FIELDS,
+                        params=get_search_params()
+                    )
+                ]
             )
             
-            # Separate document and chat results
-            document_results = []
-            chat_results = []
-            
-            for result in all_results:
-                if result.payload.get("type") == "chat_history":
-                    if len(chat_results) < chat_limit:
-                        chat_results.append({
-                            "chat_id": result.payload["chat_id"],
-                            "text": result.payload["text"],
-                            "conversation_id": result.payload.get("conversation_id"),
-                            "similarity_score": result.score
-                        })
-                else:
-                    # Document chunk
-                    if len(document_results) < doc_limit:
-                        document_results.append({
-                            "document_id": result.payload["document_id"],
-                            "filename": result.payload["filename"],
-                            "chunk_index": result.payload["chunk_index"],
-                            "chunk_text": result.payload["chunk_text"],
-                            "similarity_score": result.score
-                        })
-                
-                # Stop when we have enough of both
-                if len(document_results) >= doc_limit and len(chat_results) >= chat_limit:
-                    break
+            document_results = QdrantService._format_document_results(document_hits)
+            chat_results = [
+                {
+                    "chat_id": result.payload["chat_id"],
+                    "text": result.payload["text"],
+                    "conversation_id": result.payload.get("conversation_id"),
+                    "similarity_score": result.score
+                }
+                for result in chat_hits
+            ]
             
             return {
                 "document_results": document_results,
@@ -5,15 +5,26 @@ Async background jobs for document upload and processing
 
 import os
 import uuid
+from itertools import islice
+from typing import Iterable, Iterator
+import httpx
+import redis
+from openai import APIConnectionError, APIStatusError
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 
 from app.celery_app import celery_app
 from app.config import settings
 from app.models.document import Document
-from app.utils.file_parser import FileParser, chunk_text
+from app.utils.file_parser import iter_document_chunks
 from app.utils.embeddings import generate_embeddings
+from app.utils.rate_limiter import embedding_rate_limiter
+from app.utils.text_cache import CorruptCacheEntryError
+from app.utils.qdrant_client import get_collection_name
 from app.services.qdrant_service import QdrantService
+from app.services.document_service import DocumentService
 
 
 # Create database session for Celery tasks
@@ -21,11 +32,66 @@ engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-@celery_app.task(bind=True, name="process_document_async")
+# Errors worth retrying: the same document may well succeed a little later
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    httpx.TransportError,
+    APIConnectionError,  # Includes APITimeoutError
+    ResponseHandlingException,
+    redis.ConnectionError,
+    redis.TimeoutError,
+    OperationalError,
+    CorruptCacheEntryError  # The entry is deleted, so a retry re-parses
+)
+
+
+def _is_transient_error(error: BaseException) -> bool:
+    """
+    Check whether an error (or one it was raised from) is transient
+    
+    Services wrap errors in ValueError, so the chain of causes is searched.
+    
+    Args:
+        error: Exception raised while processing a document
+        
+    Returns:
+        True for connection errors, timeouts and 429/5xx responses; False
+        for anything retrying cannot fix (corrupt file, no text extracted,
+        rejected request, dimension mismatch)
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, TRANSIENT_ERRORS):
+            return True
+        if isinstance(error, (APIStatusError, UnexpectedResponse)):
+            status_code = error.status_code or 0
+            if status_code == 429 or status_code >= 500:
+                return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most `size` items"""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@celery_app.task(bind=True, name="process_document_async", max_retries=settings.DOCUMENT_TASK_MAX_RETRIES)
 def process_document_async(self, document_id: str, user_id: str, file_path: str, filename: str):
     """
     Process document asynchronously: parse, chunk, embed, and store in Qdrant
     
+    Progress is checkpointed in documents.chunks_indexed after each stored
+    batch. Attempts that fail on a transient error (see _is_transient_error)
+    are retried with backoff and resume after the last checkpoint; any
+    other error marks the document failed right away. Point IDs are
+    derived from (document_id, chunk_index), so re-storing a partially
+    written batch does not duplicate chunks.
+    
     Args:
         self: Celery task instance
         document_id: Document UUID
@@ -39,42 +105,94 @@ def process_document_async(self, document_id: str, user_id: str, file_path: str,
     db = SessionLocal()
     
     try:
-        # Update task status
-        self.update_state(state='PROCESSING', meta={'status': 'Parsing document...'})
+        # 0. Reuse embeddings if identical content is already indexed
+        document = db.query(Document).filter(Document.id == uuid.UUID(document_id)).first()
+        resume_from = document.chunks_indexed if document else 0
+        duplicate = DocumentService.find_indexed_duplicate(db, document) if document and not resume_from else None
         
-        # 1. Parse document
-        text = FileParser.parse_file(file_path)
-        if not text:
-            raise ValueError("No text extracted from document")
+        if duplicate:
+            self.update_state(state='PROCESSING', meta={'status': 'Reusing existing embeddings...'})
+            
+            try:
+                chunks_processed = QdrantService.copy_document_embeddings(
+                    source_user_id=str(duplicate.user_id),
+                    source_document_id=duplicate.id,
+                    target_user_id=user_id,
+                    target_document_id=uuid.UUID(document_id),
+                    filename=filename
+                )
+            except Exception as e:
+                # Fall back to normal ingestion; chunk point IDs are deterministic,
+                # so anything copied before the error is overwritten
+                print(f"Reusing embeddings failed, re-processing: {e}")
+                chunks_processed = 0
+            
+            if chunks_processed:
+                collection_name = get_collection_name(user_id)
+                document.vector_collection_id = collection_name
+                document.chunks_indexed = chunks_processed
+                document.processing_status = "completed"
+                db.commit()
+                
+                db.close()
+                
+                return {
+                    'status': 'success',
+                    'collection_name': collection_name,
+                    'chunks_processed': chunks_processed,
+                    'reused_embeddings': True
+                }
         
         # Update task status
-        self.update_state(state='PROCESSING', meta={'status': 'Chunking text...'})
+        if resume_from:
+            self.update_state(state='PROCESSING', meta={'status': f'Resuming after chunk {resume_from}...'})
+        else:
+            self.update_state(state='PROCESSING', meta={'status': 'Parsing document...'})
         
-        # 2. Split into chunks
-        chunks = chunk_text(
-            text,
-            chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP
+        # 1-2. Parse and chunk as a stream, so embedding starts before parsing ends
+        chunks = iter_document_chunks(
+            file_path,
+            content_hash=document.content_hash if document else None
         )
         
-        # Update task status
-        self.update_state(state='PROCESSING', meta={'status': f'Generating embeddings for {len(chunks)} chunks...'})
+        collection_name = QdrantService.create_user_collection(user_id)
+        chunks_processed = resume_from
+        rate_limit_wait = embedding_rate_limiter.wait_seconds
         
-        # 3. Generate embeddings
-        embeddings = generate_embeddings(chunks)
+        # Chunking is deterministic, so already stored chunks are skipped unembedded
+        for batch in _batched(islice(chunks, resume_from, None), settings.EMBEDDING_BATCH_SIZE):
+            # Update task status
+            self.update_state(state='PROCESSING', meta={'status': f'Embedding chunks {chunks_processed + 1}-{chunks_processed + len(batch)}...'})
+            
+            batch_chunks = [chunk for chunk, _ in batch]
+            token_counts = [token_count for _, token_count in batch]
+            
+            # 3. Generate embeddings
+            embeddings = generate_embeddings(batch_chunks, token_counts=token_counts)
+            
+            # 4. Store in Qdrant
+            QdrantService.store_document_embeddings(
+                user_id=user_id,
+                document_id=uuid.UUID(document_id),
+                chunks=batch_chunks,
+                embeddings=embeddings,
+                filename=filename,
+                start_index=chunks_processed,
+                token_counts=token_counts,
+                progress_callback=lambda stored: self.update_state(
+                    state='PROCESSING',
+                    meta={'status': f'Storing chunks {chunks_processed + 1}-{chunks_processed + stored}...'}
+                )
+            )
+            chunks_processed += len(batch)
+            
+            # Checkpoint: a retry resumes after this batch
+            if document:
+                document.chunks_indexed = chunks_processed
+                db.commit()
         
-        # Update task status
-        self.update_state(state='PROCESSING', meta={'status': 'Storing in vector database...'})
-        
-        # 4. Store in Qdrant
-        collection_name = QdrantService.create_user_collection(user_id)
-        QdrantService.store_document_embeddings(
-            user_id=user_id,
-            document_id=uuid.UUID(document_id),
-            chunks=chunks,
-            embeddings=embeddings,
-            filename=filename
-        )
+        if not chunks_processed:
+            raise ValueError("No text extracted from document")
         
         # 5. Update document record with collection ID
         document = db.query(Document).filter(Document.id == uuid.UUID(document_id)).first()
@@ -88,19 +206,27 @@ def process_document_async(self, document_id: str, user_id: str, file_path: str,
         return {
             'status': 'success',
             'collection_name': collection_name,
-            'chunks_processed': len(chunks)
+            'chunks_processed': chunks_processed,
+            'rate_limit_wait_seconds': round(embedding_rate_limiter.wait_seconds - rate_limit_wait, 3)
         }
         
     except Exception as e:
-        # Update document status to failed
+        db.rollback()
+        retrying = _is_transient_error(e) and self.request.retries < self.max_retries
+        
+        # Update document status to failed, or record the error until the retry
         document = db.query(Document).filter(Document.id == uuid.UUID(document_id)).first()
         if document:
-            document.processing_status = "failed"
-            document.processing_error = str(e)
+            if not retrying:
+                document.processing_status = "failed"
+            document.processing_error = str(e)[:512]
             db.commit()
         
         db.close()
         
+        if retrying:
+            raise self.retry(exc=e, countdown=settings.DOCUMENT_TASK_RETRY_DELAY * 2 ** self.request.retries)
+        
         # Raise exception for Celery to mark task as failed
         raise Exception(f"Document processing failed: {str(e)}")
 
@@ -0,0 +1,91 @@
+"""
+Chunk Store
+Compressed document chunk text in PostgreSQL, keyed by Qdrant point ID
+"""
+
+import uuid
+import zlib
+from typing import Dict, List, Tuple
+
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.document import Document
+from app.models.document_chunk import DocumentChunk
+
+
+def is_enabled() -> bool:
+    """Whether new chunk text goes to the chunk store instead of the Qdrant payload"""
+    return settings.CHUNK_TEXT_STORE == "postgres"
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), settings.CHUNK_STORE_COMPRESSION_LEVEL)
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def store_chunks(rows: List[Tuple[str, str, int, str]]) -> None:
+    """
+    Store chunk texts, replacing existing rows with the same point ID
+    
+    Args:
+        rows: (point_id, document_id, chunk_index, text) tuples
+    """
+    if not rows:
+        return
+    
+    statement = insert(DocumentChunk).values([
+        {
+            "id": uuid.UUID(str(point_id)),
+            "document_id": uuid.UUID(str(document_id)),
+            "chunk_index": chunk_index,
+            "content": compress_text(text)
+        }
+        for point_id, document_id, chunk_index, text in rows
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[DocumentChunk.id],
+        set_={"chunk_index": statement.excluded.chunk_index, "content": statement.excluded.content}
+    )
+    
+    db = SessionLocal()
+    try:
+        db.execute(statement)
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_chunks(point_ids: List[str]) -> Dict[str, dict]:
+    """
+    Fetch chunk texts and filenames in one query
+    
+    Args:
+        point_ids: Qdrant point IDs
+        
+    Returns:
+        Mapping of point ID to {"chunk_text", "filename"}; IDs not in the
+        store are left out
+    """
+    if not point_ids:
+        return {}
+    
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(DocumentChunk.id, DocumentChunk.content, Document.filename)
+            .join(Document, Document.id == DocumentChunk.document_id)
+            .filter(DocumentChunk.id.in_([uuid.UUID(str(point_id)) for point_id in point_ids]))
+            .all()
+        )
+    finally:
+        db.close()
+    
+    return {
+        str(point_id): {"chunk_text": decompress_text(content), "filename": filename}
+        for point_id, content, filename in rows
+    }
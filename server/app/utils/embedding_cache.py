@@ -0,0 +1,254 @@
+"""
+Embedding Cache
+Two-tier cache for embedding vectors: in-process LRU plus shared Redis
+"""
+
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import redis
+
+from app.config import settings
+
+
+def get_cache_key(text: str, model: str, dimension: int) -> str:
+    """
+    Build the cache key for a text
+    
+    Args:
+        text: Embedded text
+        model: Embedding model
+        dimension: Embedding dimension
+        
+    Returns:
+        Key in format: emb:{model}:{dimension}:{sha256 of text}
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"emb:{model}:{dimension}:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Embedding cache with a size-bounded in-process LRU in front of Redis
+    
+    Vectors are stored as packed float32 bytes in both tiers. Redis errors
+    are treated as misses so the cache never fails an embedding call.
+    """
+    
+    def __init__(self, backend: str, memory_bytes: int, ttl: int):
+        """
+        Args:
+            backend: "none", "memory" (LRU only) or "redis" (LRU + Redis)
+            memory_bytes: Maximum size of the in-process tier
+            ttl: Expiry of Redis entries in seconds
+        """
+        self.backend = backend
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._redis: Optional[redis.Redis] = None
+        
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.backend in ("memory", "redis")
+    
+    def _get_redis(self) -> redis.Redis:
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(settings.REDIS_URL)
+        return self._redis
+    
+    def _remember(self, key: str, value: bytes) -> None:
+        """Add an entry to the LRU tier, evicting the oldest past the size limit"""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            
+            self._entries[key] = value
+            self._size += len(value)
+            
+            while self._size > self.memory_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+    
+    def get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up vectors for keys
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Vector for each key, None on miss
+        """
+        if not self.enabled:
+            return [None] * len(keys)
+        
+        found: List[Optional[bytes]] = [None] * len(keys)
+        
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[i] = value
+                    self.memory_hits += 1
+        
+        missing = [i for i, value in enumerate(found) if value is None]
+        
+        if missing and self.backend == "redis":
+            try:
+                values = self._get_redis().mget([keys[i] for i in missing])
+                for i, value in zip(missing, values):
+                    if value is not None:
+                        found[i] = value
+                        self._remember(keys[i], value)
+                        self.shared_hits += 1
+            except redis.RedisError as e:
+                print(f"Embedding cache read failed: {e}")
+        
+        self.misses += sum(1 for value in found if value is None)
+        
+        return [array("f", value).tolist() if value is not None else None for value in found]
+    
+    def set_many(self, vectors: Dict[str, List[float]]) -> None:
+        """
+        Store vectors
+        
+        Args:
+            vectors: Mapping of cache key to vector
+        """
+        if not self.enabled or not vectors:
+            return
+        
+        packed = {key: array("f", vector).tobytes() for key, vector in vectors.items()}
+        
+        for key, value in packed.items():
+            self._remember(key, value)
+        
+        if self.backend == "redis":
+            try:
+                pipeline = self._get_redis().pipeline(transaction=False)
+                for key, value in packed.items():
+                    pipeline.set(key, value, ex=self.ttl)
+                pipeline.execute()
+            except redis.RedisError as e:
+                print(f"Embedding cache write failed: {e}")
+    
+    def acquire_locks(self, keys: List[str], ttl: float) -> List[bool]:
+        """
+        Take short-lived Redis locks marking keys as being embedded
+        
+        Args:
+            keys: Cache keys
+            ttl: Lock expiry in seconds (covers crashed owners)
+            
+        Returns:
+            Whether each lock was acquired; all True if Redis is unavailable
+        """
+        if self.backend != "redis":
+            return [True] * len(keys)
+        
+        try:
+            pipeline = self._get_redis().pipeline(transaction=False)
+            for key in keys:
+                pipeline.set(f"lock:{key}", 1, nx=True, px=int(ttl * 1000))
+            return [bool(result) for result in pipeline.execute()]
+        except redis.RedisError as e:
+            print(f"Embedding cache lock failed: {e}")
+            return [True] * len(keys)
+    
+    def release_locks(self, keys: List[str]) -> None:
+        """
+        Release locks taken with acquire_locks
+        
+        Args:
+            keys: Cache keys
+        """
+        if self.backend != "redis" or not keys:
+            return
+        
+        try:
+            self._get_redis().delete(*[f"lock:{key}" for key in keys])
+        except redis.RedisError as e:
+            print(f"Embedding cache unlock failed: {e}")
+    
+    def wait_for(self, keys: List[str], timeout: float, interval: float = 0.05) -> Dict[str, List[float]]:
+        """
+        Wait for other processes to store vectors in the shared tier
+        
+        Args:
+            keys: Cache keys locked by other processes
+            timeout: Maximum seconds to wait
+            interval: Seconds between polls
+            
+        Returns:
+            Mapping of key to vector for the keys that appeared in time
+        """
+        found: Dict[str, List[float]] = {}
+        if self.backend != "redis":
+            return found
+        
+        pending = list(keys)
+        deadline = time.monotonic() + timeout
+        
+        while pending and time.monotonic() < deadline:
+            time.sleep(interval)
+            try:
+                values = self._get_redis().mget(pending)
+            except redis.RedisError as e:
+                print(f"Embedding cache read failed: {e}")
+                break
+            
+            for key, value in zip(pending, values):
+                if value is not None:
+                    self._remember(key, value)
+                    self.shared_hits += 1
+                    found[key] = array("f", value).tolist()
+            pending = [key for key in pending if key not in found]
+        
+        return found
+    
+    def stats(self) -> dict:
+        """
+        Get cache counters
+        
+        Returns:
+            Dict with hit/miss counts, hit rate and in-process tier size
+        """
+        lookups = self.memory_hits + self.shared_hits + self.misses
+        return {
+            "backend": self.backend,
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.shared_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "memory_bytes": self._size
+        }
+    
+    def clear(self) -> None:
+        """Clear the in-process tier and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        self.memory_hits = self.shared_hits = self.misses = 0
+
+
+# Process-wide cache instance
+embedding_cache = EmbeddingCache(
+    backend=settings.EMBEDDING_CACHE_BACKEND,
+    memory_bytes=settings.EMBEDDING_CACHE_MEMORY_MB * 1024 * 1024,
+    ttl=settings.EMBEDDING_CACHE_TTL
+)
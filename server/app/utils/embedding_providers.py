@@ -0,0 +1,237 @@
+"""
+Embedding Providers
+Interchangeable backends that turn texts into embedding vectors
+"""
+
+import asyncio
+import re
+import zlib
+from functools import lru_cache
+from typing import List, Optional
+
+import httpx
+import numpy as np
+from openai import OpenAI, AsyncOpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+
+from app.config import settings
+
+# Errors worth retrying with backoff
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+# Native output size of OpenAI embedding models
+OPENAI_MODEL_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingProvider:
+    """Base class for embedding backends"""
+    
+    # Identifies the vector space in cache keys
+    name: str = ""
+    
+    # Remote providers get token-budgeted, concurrent requests
+    remote: bool = False
+    
+    @property
+    def dimension(self) -> int:
+        """Size of the vectors returned by embed"""
+        raise NotImplementedError
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Embedding vectors in input order
+        """
+        raise NotImplementedError
+    
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts without blocking the event loop
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            Embedding vectors in input order
+        """
+        return await asyncio.to_thread(self.embed, texts)
+    
+    async def aclose(self) -> None:
+        """Close connections held for async calls (on application shutdown)"""
+
+
+def _http_limits() -> httpx.Limits:
+    """Connection pool limits shared by the embedding HTTP clients"""
+    return httpx.Limits(
+        max_connections=settings.EMBEDDING_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.EMBEDDING_HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=settings.EMBEDDING_HTTP_KEEPALIVE_EXPIRY
+    )
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from the OpenAI API"""
+    
+    remote = True
+    
+    def __init__(self, model: str, dimensions: int = 0):
+        """
+        Args:
+            model: Embedding model
+            dimensions: Shortened output size, 0 for the model's native size
+        """
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f"openai:{model}"
+        # Retries are done per batch (embeddings._embed_batch), not by the SDK
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=0,
+            http_client=httpx.Client(limits=_http_limits())
+        )
+        # Created on first use in the application's event loop, closed by aclose()
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._async_semaphore: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def dimension(self) -> int:
+        return self.dimensions or OPENAI_MODEL_DIMENSIONS.get(self.model, 1536)
+    
+    def _request_options(self) -> dict:
+        # Shortened output is only requested when configured (text-embedding-3 models)
+        return {"dimensions": self.dimensions} if self.dimensions else {}
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one request's worth of texts in a single API call
+        
+        Transient errors are raised; callers retry (see embeddings._embed_batch),
+        passing the rate limiter before every attempt.
+        
+        Args:
+            texts: Texts to embed (within the per-request limits)
+            
+        Returns:
+            Embedding vectors in input order
+        """
+        response = self.client.embeddings.create(
+            model=self.model,
+            input=texts,
+            **self._request_options()
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    def _get_async_state(self) -> tuple[AsyncOpenAI, asyncio.Semaphore]:
+        """
+        Get the pooled async client and request cap, creating them on first use
+        
+        Both belong to the event loop of the first async call (the API
+        server's loop) and live until aclose().
+        
+        Returns:
+            Tuple of (AsyncOpenAI client, semaphore limiting requests in flight)
+        """
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=_http_limits())
+            )
+            self._async_semaphore = asyncio.Semaphore(settings.EMBEDDING_ASYNC_CONCURRENCY)
+        return self._async_client, self._async_semaphore
+    
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            client, self._async_client, self._async_semaphore = self._async_client, None, None
+            await client.close()
+    
+    async def embed_async(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one request's worth of texts on the shared async client,
+        waiting for a slot under EMBEDDING_ASYNC_CONCURRENCY
+        
+        Transient errors are raised; callers retry (see embeddings._embed_batch_async).
+        
+        Args:
+            texts: Texts to embed (within the per-request limits)
+            
+        Returns:
+            Embedding vectors in input order
+        """
+        client, semaphore = self._get_async_state()
+        
+        async with semaphore:
+            response = await client.embeddings.create(
+                model=self.model,
+                input=texts,
+                **self._request_options()
+            )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic local embeddings from hashed word unigrams and bigrams
+    
+    Needs no network or model download: each term is hashed (CRC32) to a
+    signed bucket and rows are L2-normalized, all vectorized with NumPy.
+    Texts sharing vocabulary get similar vectors, which is enough for
+    offline ingestion/chat load tests and development.
+    """
+    
+    _WORD = re.compile(r"\w+")
+    
+    def __init__(self, dimension: int):
+        self._dimension = dimension
+        self.name = f"local-hash:v1:{dimension}"
+    
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+    
+    def _terms(self, text: str) -> List[str]:
+        words = self._WORD.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        rows, hashes = [], []
+        for row, text in enumerate(texts):
+            for term in self._terms(text):
+                rows.append(row)
+                hashes.append(zlib.crc32(term.encode("utf-8")))
+        
+        vectors = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        if hashes:
+            hashes = np.asarray(hashes, dtype=np.uint32)
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors, (np.asarray(rows), hashes % self._dimension), signs)
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+        return vectors.tolist()
+
+
+@lru_cache(maxsize=None)
+def get_embedding_provider() -> EmbeddingProvider:
+    """
+    Get the configured embedding provider (created once per process)
+    
+    Returns:
+        Provider selected by EMBEDDING_PROVIDER
+        
+    Raises:
+        ValueError: If the provider name is unknown
+    """
+    if settings.EMBEDDING_PROVIDER == "openai":
+        return OpenAIEmbeddingProvider(settings.OPENAI_EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS)
+    if settings.EMBEDDING_PROVIDER == "local":
+        return HashingEmbeddingProvider(settings.LOCAL_EMBEDDING_DIMENSION)
+    raise ValueError(f"Unsupported embedding provider: {settings.EMBEDDING_PROVIDER}")
@@ -1,15 +1,20 @@
 """
-OpenAI Embeddings Utilities
-Generate embeddings for text using OpenAI API
+Embeddings Utilities
+Generate embeddings for text with the configured provider
 """
 
-from typing import List
-from openai import OpenAI
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional
 
 from app.config import settings
-
-# Initialize OpenAI client
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+from app.utils.tokenizer import count_tokens
+from app.utils.embedding_cache import embedding_cache, get_cache_key
+from app.utils.embedding_providers import EmbeddingProvider, RETRYABLE_ERRORS, get_embedding_provider
+from app.utils.rate_limiter import embedding_rate_limiter
 
 
 def generate_embedding(text: str) -> List[float]:
@@ -22,48 +27,471 @@ def generate_embedding(text: str) -> List[float]:
     Returns:
         Embedding vector
     """
-    try:
-        response = client.embeddings.create(
-            model=settings.OPENAI_EMBEDDING_MODEL,
-            input=text
+    return generate_embeddings([text])[0]
+
+
+def _plan_batches(token_counts: List[int]) -> List[tuple[int, int]]:
+    """
+    Split inputs into consecutive batches within the per-request limits
+    
+    Args:
+        token_counts: Token count of each input
+        
+    Returns:
+        List of (start, end) index ranges
+    """
+    batches = []
+    start = 0
+    batch_tokens = 0
+    
+    for i, tokens in enumerate(token_counts):
+        batch_full = (
+            i - start >= settings.EMBEDDING_REQUEST_MAX_INPUTS
+            or batch_tokens + tokens > settings.EMBEDDING_REQUEST_MAX_TOKENS
         )
-        return response.data[0].embedding
-    except Exception as e:
-        raise ValueError(f"Error generating embedding: {str(e)}")
+        if i > start and batch_full:
+            batches.append((start, i))
+            start = i
+            batch_tokens = 0
+        batch_tokens += tokens
+    
+    batches.append((start, len(token_counts)))
+    return batches
+
+
+def _collect_missing(
+    texts: List[str],
+    token_counts: Optional[List[int]],
+    keys: List[str],
+    embeddings: List[Optional[List[float]]]
+) -> tuple[List[str], List[str], List[int]]:
+    """
+    Collect the distinct texts that missed the cache
+    
+    Args:
+        texts: Requested texts
+        token_counts: Optional precomputed token count of each text
+        keys: Cache key of each text
+        embeddings: Cached vector of each text, None on miss
+        
+    Returns:
+        Tuple of (keys, texts, token_counts) with each missing text once
+    """
+    missing: dict[str, int] = {}
+    for i, embedding in enumerate(embeddings):
+        if embedding is None:
+            missing.setdefault(keys[i], i)
+    
+    indexes = list(missing.values())
+    missing_texts = [texts[i] for i in indexes]
+    if token_counts is None:
+        missing_counts = [count_tokens(text) for text in missing_texts]
+    else:
+        missing_counts = [token_counts[i] for i in indexes]
+    
+    return list(missing), missing_texts, missing_counts
+
+
+def _fill_missing(
+    keys: List[str],
+    embeddings: List[Optional[List[float]]],
+    new_embeddings: dict[str, List[float]]
+) -> List[List[float]]:
+    """Replace cache misses with freshly generated vectors"""
+    return [
+        embedding if embedding is not None else new_embeddings[key]
+        for key, embedding in zip(keys, embeddings)
+    ]
+
+
+def _embed_batch(provider: EmbeddingProvider, texts: List[str], tokens: int) -> List[List[float]]:
+    """
+    Send one batch to a remote provider, retrying transient API errors
+    with exponential backoff
+    
+    Every attempt, retries included, first waits for the cluster-wide rate
+    limiter, so retries after a 429 are throttled like any other request.
+    
+    Args:
+        provider: Remote embedding provider
+        texts: Texts of the batch
+        tokens: Token count of the batch
+        
+    Returns:
+        Embedding vectors in input order
+    """
+    for attempt in range(settings.EMBEDDING_MAX_RETRIES + 1):
+        embedding_rate_limiter.acquire(tokens=tokens)
+        try:
+            return provider.embed(texts)
+        except RETRYABLE_ERRORS:
+            if attempt == settings.EMBEDDING_MAX_RETRIES:
+                raise
+            time.sleep(2 ** attempt + random.random())
+
+
+async def _embed_batch_async(provider: EmbeddingProvider, texts: List[str], tokens: int) -> List[List[float]]:
+    """
+    Send one batch to a remote provider without blocking the event loop,
+    retrying like _embed_batch
+    
+    Args:
+        provider: Remote embedding provider
+        texts: Texts of the batch
+        tokens: Token count of the batch
+        
+    Returns:
+        Embedding vectors in input order
+    """
+    for attempt in range(settings.EMBEDDING_MAX_RETRIES + 1):
+        await embedding_rate_limiter.acquire_async(tokens=tokens)
+        try:
+            return await provider.embed_async(texts)
+        except RETRYABLE_ERRORS:
+            if attempt == settings.EMBEDDING_MAX_RETRIES:
+                raise
+            await asyncio.sleep(2 ** attempt + random.random())
+
+
+def _embed_texts(texts: List[str], token_counts: List[int]) -> List[List[float]]:
+    """
+    Embed texts with a remote provider in token-budgeted batches sent concurrently
+    
+    Args:
+        texts: Texts to embed
+        token_counts: Token count of each text
+        
+    Returns:
+        Embedding vectors in input order
+    """
+    provider = get_embedding_provider()
+    batches = _plan_batches(token_counts)
+    
+    def embed_batch(batch: tuple[int, int]) -> List[List[float]]:
+        start, end = batch
+        return _embed_batch(provider, texts[start:end], sum(token_counts[start:end]))
+    
+    if len(batches) == 1:
+        return embed_batch(batches[0])
+    
+    with ThreadPoolExecutor(max_workers=min(settings.EMBEDDING_CONCURRENCY, len(batches))) as executor:
+        results = executor.map(embed_batch, batches)
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+
+async def _embed_texts_async(texts: List[str], token_counts: List[int]) -> List[List[float]]:
+    """
+    Embed texts with a remote provider on its shared async client
+    
+    Args:
+        texts: Texts to embed
+        token_counts: Token count of each text
+        
+    Returns:
+        Embedding vectors in input order
+    """
+    provider = get_embedding_provider()
+    
+    results = await asyncio.gather(*(
+        _embed_batch_async(provider, texts[start:end], sum(token_counts[start:end]))
+        for start, end in _plan_batches(token_counts)
+    ))
+    return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+
+class _OwnerCancelled(Exception):
+    """Handed to waiting callers when the caller embedding their keys was cancelled"""
+
+
+class _SingleFlight:
+    """
+    Coalesce concurrent requests for the same embedding
+    
+    Within a process, the first caller to miss the cache for a key owns it
+    and later callers wait on its future instead of calling the API. With
+    EMBEDDING_SINGLE_FLIGHT=redis, owners also take a short Redis lock per
+    key so other processes wait for the shared cache entry. A waiter whose
+    owner is cancelled or takes longer than EMBEDDING_SINGLE_FLIGHT_TIMEOUT
+    embeds the text itself.
+    """
+    
+    def __init__(self):
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+    
+    @property
+    def mode(self) -> str:
+        return settings.EMBEDDING_SINGLE_FLIGHT
+    
+    def claim(self, keys: List[str]) -> tuple[List[str], List[str], dict[str, Future]]:
+        """
+        Split missing keys by who embeds them
+        
+        Args:
+            keys: Distinct keys that missed the cache
+            
+        Returns:
+            Tuple of (keys to embed now, keys being embedded by another
+            process, futures of keys being embedded by another caller here)
+        """
+        if self.mode == "none":
+            return keys, [], {}
+        
+        owned, waiting = [], {}
+        with self._lock:
+            for key in keys:
+                future = self._futures.get(key)
+                if future is None:
+                    self._futures[key] = Future()
+                    owned.append(key)
+                else:
+                    waiting[key] = future
+        
+        busy = []
+        if self.mode == "redis" and owned:
+            acquired = embedding_cache.acquire_locks(owned, settings.EMBEDDING_SINGLE_FLIGHT_TIMEOUT)
+            busy = [key for key, ok in zip(owned, acquired) if not ok]
+            owned = [key for key, ok in zip(owned, acquired) if ok]
+        
+        return owned, busy, waiting
+    
+    def publish(self, vectors: dict[str, List[float]], locked: bool) -> None:
+        """
+        Cache finished vectors and hand them to waiting callers
+        
+        Args:
+            vectors: Mapping of key to vector
+            locked: Whether this process holds the Redis locks for the keys
+        """
+        embedding_cache.set_many(vectors)
+        if locked and self.mode == "redis":
+            embedding_cache.release_locks(list(vectors))
+        
+        with self._lock:
+            futures = [(self._futures.pop(key, None), vector) for key, vector in vectors.items()]
+        for future, vector in futures:
+            if future is not None and not future.done():
+                future.set_result(vector)
+    
+    def abort(self, keys: List[str], locked_keys: List[str], error: BaseException) -> None:
+        """
+        Fail waiting callers and release locks after an embedding error
+        
+        Args:
+            keys: Keys this caller owned and did not publish
+            locked_keys: Those of the keys this process holds Redis locks for
+            error: Error to propagate to waiting callers; a cancellation
+                makes them embed the texts themselves instead
+        """
+        if locked_keys and self.mode == "redis":
+            embedding_cache.release_locks(locked_keys)
+        
+        if not isinstance(error, Exception):
+            error = _OwnerCancelled(repr(error))
+        
+        with self._lock:
+            futures = [self._futures.pop(key, None) for key in keys]
+        for future in futures:
+            if future is not None and not future.done():
+                future.set_exception(error)
+
+
+_single_flight = _SingleFlight()
 
 
-def generate_embeddings(texts: List[str]) -> List[List[float]]:
+def generate_embeddings(texts: List[str], token_counts: Optional[List[int]] = None) -> List[List[float]]:
     """
     Generate embeddings for multiple texts
     
+    Cached vectors are reused and texts already being embedded by another
+    caller are waited for (see _SingleFlight). The remaining distinct texts
+    are split into batches bounded by EMBEDDING_REQUEST_MAX_INPUTS and
+    EMBEDDING_REQUEST_MAX_TOKENS, sent with up to EMBEDDING_CONCURRENCY
+    requests in flight, and retried per batch.
+    
     Args:
         texts: List of texts to embed
+        token_counts: Optional precomputed token count of each text
         
     Returns:
-        List of embedding vectors
+        List of embedding vectors, in the order of texts
     """
     if not texts:
         return []
     
+    provider = get_embedding_provider()
+    
+    # Local providers are cheaper than a cache lookup
+    if not provider.remote:
+        return provider.embed(texts)
+    
+    keys = [get_cache_key(text, provider.name, provider.dimension) for text in texts]
+    embeddings = embedding_cache.get_many(keys)
+    
+    if None not in embeddings:
+        return embeddings
+    
     try:
-        response = client.embeddings.create(
-            model=settings.OPENAI_EMBEDDING_MODEL,
-            input=texts
-        )
-        return [item.embedding for item in response.data]
+        missing_keys, missing_texts, missing_counts = _collect_missing(texts, token_counts, keys, embeddings)
     except Exception as e:
         raise ValueError(f"Error generating embeddings: {str(e)}")
+    
+    inputs = {key: (text, count) for key, text, count in zip(missing_keys, missing_texts, missing_counts)}
+    
+    def embed(batch_keys: List[str]) -> dict[str, List[float]]:
+        batch_inputs = [inputs[key] for key in batch_keys]
+        return dict(zip(batch_keys, _embed_texts([text for text, _ in batch_inputs], [count for _, count in batch_inputs])))
+    
+    owned, busy, waiting = _single_flight.claim(missing_keys)
+    new_embeddings: dict[str, List[float]] = {}
+    
+    try:
+        if owned:
+            vectors = embed(owned)
+            _single_flight.publish(vectors, locked=True)
+            new_embeddings.update(vectors)
+        
+        if busy:
+            vectors = embedding_cache.wait_for(busy, settings.EMBEDDING_SINGLE_FLIGHT_TIMEOUT)
+            leftover = [key for key in busy if key not in vectors]
+            if leftover:
+                vectors.update(embed(leftover))
+            _single_flight.publish(vectors, locked=False)
+            new_embeddings.update(vectors)
+        
+        # Texts whose owner was cancelled or is too slow are embedded here
+        deadline = time.monotonic() + settings.EMBEDDING_SINGLE_FLIGHT_TIMEOUT
+        leftover = []
+        for key, future in waiting.items():
+            try:
+                new_embeddings[key] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except (FutureTimeoutError, _OwnerCancelled):
+                leftover.append(key)
+        if leftover:
+            vectors = embed(leftover)
+            embedding_cache.set_many(vectors)
+            new_embeddings.update(vectors)
+    except BaseException as e:
+        # Owned keys are always released, so a cancelled caller never strands waiters
+        unpublished = [key for key in owned + busy if key not in new_embeddings]
+        _single_flight.abort(unpublished, [key for key in owned if key not in new_embeddings], e)
+        if not isinstance(e, Exception):
+            raise
+        raise ValueError(f"Error generating embeddings: {str(e)}")
+    
+    return _fill_missing(keys, embeddings, new_embeddings)
+
+
+async def generate_embedding_async(text: str) -> List[float]:
+    """
+    Generate embedding for a single text without blocking the event loop
+    
+    Args:
+        text: Text to embed
+        
+    Returns:
+        Embedding vector
+    """
+    return (await generate_embeddings_async([text]))[0]
+
+
+async def generate_embeddings_async(texts: List[str], token_counts: Optional[List[int]] = None) -> List[List[float]]:
+    """
+    Generate embeddings for multiple texts without blocking the event loop
+    
+    Same caching, coalescing and batching as generate_embeddings, but
+    batches are sent on the provider's pooled async client (one per
+    process, closed by close_embedding_clients), capped process-wide by
+    EMBEDDING_ASYNC_CONCURRENCY rather than per call.
+    
+    Args:
+        texts: List of texts to embed
+        token_counts: Optional precomputed token count of each text
+        
+    Returns:
+        List of embedding vectors, in the order of texts
+    """
+    if not texts:
+        return []
+    
+    provider = get_embedding_provider()
+    
+    # Local providers are cheaper than a cache lookup
+    if not provider.remote:
+        return await provider.embed_async(texts)
+    
+    keys = [get_cache_key(text, provider.name, provider.dimension) for text in texts]
+    embeddings = await asyncio.to_thread(embedding_cache.get_many, keys)
+    
+    if None not in embeddings:
+        return embeddings
+    
+    try:
+        missing_keys, missing_texts, missing_counts = _collect_missing(texts, token_counts, keys, embeddings)
+    except Exception as e:
+        raise ValueError(f"Error generating embeddings: {str(e)}")
+    
+    inputs = {key: (text, count) for key, text, count in zip(missing_keys, missing_texts, missing_counts)}
+    
+    async def embed(batch_keys: List[str]) -> dict[str, List[float]]:
+        batch_inputs = [inputs[key] for key in batch_keys]
+        vectors = await _embed_texts_async([text for text, _ in batch_inputs], [count for _, count in batch_inputs])
+        return dict(zip(batch_keys, vectors))
+    
+    owned, busy, waiting = await asyncio.to_thread(_single_flight.claim, missing_keys)
+    new_embeddings: dict[str, List[float]] = {}
+    
+    try:
+        if owned:
+            vectors = await embed(owned)
+            await asyncio.to_thread(_single_flight.publish, vectors, True)
+            new_embeddings.update(vectors)
+        
+        if busy:
+            vectors = await asyncio.to_thread(embedding_cache.wait_for, busy, settings.EMBEDDING_SINGLE_FLIGHT_TIMEOUT)
+            leftover = [key for key in busy if key not in vectors]
+            if leftover:
+                vectors.update(await embed(leftover))
+            await asyncio.to_thread(_single_flight.publish, vectors, False)
+            new_embeddings.update(vectors)
+        
+        # Texts whose owner was cancelled or is too slow are embedded here;
+        # shield() keeps a timeout from cancelling the owner's shared future
+        deadline = time.monotonic() + settings.EMBEDDING_SINGLE_FLIGHT_TIMEOUT
+        leftover = []
+        for key, future in waiting.items():
+            try:
+                new_embeddings[key] = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)),
+                    max(0.0, deadline - time.monotonic())
+                )
+            except (asyncio.TimeoutError, _OwnerCancelled):
+                leftover.append(key)
+        if leftover:
+            vectors = await embed(leftover)
+            await asyncio.to_thread(embedding_cache.set_many, vectors)
+            new_embeddings.update(vectors)
+    except BaseException as e:
+        # Owned keys are always released, so a cancelled caller never strands waiters
+        unpublished = [key for key in owned + busy if key not in new_embeddings]
+        _single_flight.abort(unpublished, [key for key in owned if key not in new_embeddings], e)
+        if not isinstance(e, Exception):
+            raise
+        raise ValueError(f"Error generating embeddings: {str(e)}")
+    
+    return _fill_missing(keys, embeddings, new_embeddings)
+
+
+async def close_embedding_clients() -> None:
+    """Close the embedding provider's async connections (on application shutdown)"""
+    await get_embedding_provider().aclose()
 
 
 def get_embedding_dimension() -> int:
     """
-    Get the dimension of embeddings for the current model
+    Get the dimension of embeddings for the current provider
     
     Returns:
         Embedding dimension
     """
-    # text-embedding-3-small: 1536 dimensions
-    # text-embedding-ada-002: 1536 dimensions
-    # text-embedding-3-large: 3072 dimensions
-    return 1536
-
+    return get_embedding_provider().dimension
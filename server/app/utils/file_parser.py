@@ -3,21 +3,78 @@ File Parsing Utilities
 Parse different document formats and extract text
 """
 
+import io
 import os
-from typing import Optional
+import itertools
+import re
+import math
+import multiprocessing
+from typing import Callable, Optional, Iterable, Iterator
 from pathlib import Path
 
 # PDF parsing
 from PyPDF2 import PdfReader
+import billiard
 
 # DOCX parsing
-from docx import Document as DocxDocument
+import zipfile
+from xml.etree import ElementTree
 
 # CSV parsing
 import csv
 
 # JSON parsing
 import json
+import ijson
+
+from app.config import settings
+from app.celery_app import get_worker_concurrency
+from app.utils.tokenizer import get_tokenizer, count_tokens
+from app.utils.text_cache import cached_segments, file_sha256
+
+# Bump whenever extraction output changes, to invalidate cached text
+PARSER_VERSION = 1
+
+# WordprocessingML tags used by the DOCX extractor
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_R, _W_T = f"{_W}p", f"{_W}r", f"{_W}t"
+_W_TAB, _W_BR, _W_CR = f"{_W}tab", f"{_W}br", f"{_W}cr"
+_W_TBL, _W_TR, _W_TC = f"{_W}tbl", f"{_W}tr", f"{_W}tc"
+
+
+def _extract_pdf_page_range(args: tuple[str, int, int]) -> list[str]:
+    """
+    Extract text of pages [start, stop) of a PDF (runs in a worker process)
+    
+    Args:
+        args: Tuple of (file_path, start page index, page index after the last page)
+        
+    Returns:
+        Text of each page, newline-terminated
+    """
+    file_path, start, stop = args
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() + "\n" for i in range(start, stop)]
+
+
+def _pdf_parse_workers() -> int:
+    """
+    Number of processes to use for PDF extraction
+    
+    Inside a Celery prefork child (a daemon process) the CPUs are shared
+    with the other pool processes, so the count is capped at
+    cpu_count // the worker's pool size (see get_worker_concurrency).
+    
+    Returns:
+        Configured worker count (CPU count if unset), at least 1
+    """
+    cpu_count = os.cpu_count() or 1
+    workers = settings.PDF_PARSE_WORKERS or cpu_count
+    
+    if multiprocessing.current_process().daemon:
+        workers = min(workers, cpu_count // get_worker_concurrency())
+    
+    return max(1, workers)
 
 
 class FileParser:
@@ -34,12 +91,52 @@ class FileParser:
         Returns:
             Extracted text content
         """
+        return "".join(FileParser.iter_pdf_pages(file_path)).strip()
+    
+    @staticmethod
+    def iter_pdf_pages(file_path: str) -> Iterator[str]:
+        """
+        Parse PDF file lazily, one page at a time
+        
+        Documents with at least PDF_PARALLEL_PAGE_THRESHOLD pages are split
+        into page ranges extracted by a billiard process pool (also inside
+        Celery workers); pages are still yielded in document order.
+        
+        Args:
+            file_path: Path to PDF file
+            
+        Yields:
+            Text of each page, newline-terminated
+        """
         try:
             reader = PdfReader(file_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            page_count = len(reader.pages)
+            workers = _pdf_parse_workers()
+            
+            if page_count < settings.PDF_PARALLEL_PAGE_THRESHOLD or workers < 2:
+                for page in reader.pages:
+                    yield page.extract_text() + "\n"
+                return
+            
+            # Large document: extract page ranges in parallel, yield in order.
+            # Several ranges per worker keeps the pool busy and lets the first
+            # pages reach the chunker early.
+            range_size = math.ceil(page_count / (workers * 4))
+            starts = range(0, page_count, range_size)
+            stops = [min(start + range_size, page_count) for start in starts]
+            
+            # billiard (Celery's multiprocessing fork) can start children from
+            # daemon processes such as prefork pool workers; the stdlib cannot
+            pool = billiard.Pool(processes=workers)
+            try:
+                for pages in pool.imap(
+                    _extract_pdf_page_range,
+                    [(file_path, start, stop) for start, stop in zip(starts, stops)]
+                ):
+                    yield from pages
+            finally:
+                pool.terminate()
+                pool.join()
         except Exception as e:
             raise ValueError(f"Error parsing PDF: {str(e)}")
     
@@ -52,12 +149,81 @@ class FileParser:
             file_path: Path to DOCX file
             
         Returns:
-            Extracted text content
+            Extracted text content (paragraphs and table rows)
         """
+        return "\n".join(FileParser.iter_docx_blocks(file_path)).strip()
+    
+    @staticmethod
+    def iter_docx_blocks(file_path: str) -> Iterator[str]:
+        """
+        Parse DOCX file lazily by streaming word/document.xml
+        
+        The XML is read with iterparse straight from the zip archive, without
+        building a document object model. Table rows are emitted with their
+        cells separated by " | "; nested tables are folded into their cell.
+        
+        Args:
+            file_path: Path to DOCX file
+            
+        Yields:
+            Paragraph and table row text in document order
+        """
+        paragraphs = []   # Text parts of each open paragraph (text boxes nest)
+        tables = []       # Per open table: {"row": cell texts, "cell": cell paragraphs}
+        runs = 0          # Open runs; tabs outside runs are tab stop definitions
+        
         try:
-            doc = DocxDocument(file_path)
-            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            return text.strip()
+            with zipfile.ZipFile(file_path) as archive:
+                with archive.open("word/document.xml") as xml_file:
+                    for event, elem in ElementTree.iterparse(xml_file, events=("start", "end")):
+                        tag = elem.tag
+                        
+                        if event == "start":
+                            if tag == _W_P:
+                                paragraphs.append([])
+                            elif tag == _W_R:
+                                runs += 1
+                            elif tag == _W_TBL:
+                                tables.append({"row": [], "cell": []})
+                            elif tag == _W_TC:
+                                tables[-1]["cell"] = []
+                            elif tag == _W_TR:
+                                tables[-1]["row"] = []
+                            continue
+                        
+                        if tag == _W_T:
+                            if paragraphs and elem.text:
+                                paragraphs[-1].append(elem.text)
+                        elif tag == _W_R:
+                            runs -= 1
+                        elif tag == _W_TAB:
+                            if paragraphs and runs:
+                                paragraphs[-1].append("\t")
+                        elif tag in (_W_BR, _W_CR):
+                            if paragraphs and runs:
+                                paragraphs[-1].append("\n")
+                        elif tag == _W_P:
+                            text = "".join(paragraphs.pop())
+                            if tables:
+                                tables[-1]["cell"].append(text)
+                            else:
+                                yield text
+                            elem.clear()
+                        elif tag == _W_TC:
+                            cell = " ".join(text for text in tables[-1]["cell"] if text.strip())
+                            tables[-1]["row"].append(cell)
+                        elif tag == _W_TR:
+                            row = " | ".join(tables[-1]["row"])
+                            if not row.strip(" |"):
+                                continue
+                            if len(tables) > 1:
+                                # Nested table: fold the row into the enclosing cell
+                                tables[-2]["cell"].append(row)
+                            else:
+                                yield row
+                        elif tag == _W_TBL:
+                            tables.pop()
+                            elem.clear()
         except Exception as e:
             raise ValueError(f"Error parsing DOCX: {str(e)}")
     
@@ -89,23 +255,79 @@ class FileParser:
         Returns:
             CSV content as formatted text
         """
+        return "\n".join(FileParser.iter_csv_rows(file_path)).strip()
+    
+    @staticmethod
+    def iter_csv_rows(file_path: str) -> Iterator[str]:
+        """
+        Parse CSV file lazily, one formatted row at a time
+        
+        Args:
+            file_path: Path to CSV file
+            
+        Yields:
+            Each data row as "header: value, ..." text
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                headers = next(reader, None)
+                
+                if headers is None:
+                    return
+                
+                for row in reader:
+                    yield ", ".join([f"{headers[i]}: {row[i]}" for i in range(len(row)) if i < len(headers)])
+        except Exception as e:
+            raise ValueError(f"Error parsing CSV: {str(e)}")
+    
+    @staticmethod
+    def iter_csv_chunks(
+        file_path: str,
+        chunk_size: int = 1000,
+        unit: str = "characters"
+    ) -> Iterator[str]:
+        """
+        Parse CSV file lazily into chunks of whole rows
+        
+        Every chunk starts with the header line followed by as many complete
+        rows as fit in chunk_size, so no row is split and each chunk keeps
+        its column context. A single row larger than chunk_size is split
+        into pieces, each under the header line.
+        
+        Args:
+            file_path: Path to CSV file
+            chunk_size: Maximum characters (or tokens) per chunk
+            unit: "characters" or "tokens"
+            
+        Yields:
+            Text chunks
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
                 reader = csv.reader(f)
-                rows = list(reader)
+                headers = next(reader, None)
+                
+                if headers is None:
+                    return
                 
-                if not rows:
-                    return ""
+                # Re-serialize rows as CSV so values containing commas stay unambiguous
+                line_buffer = io.StringIO()
+                writer = csv.writer(line_buffer, lineterminator="")
                 
-                # Format as text with headers
-                text = []
-                headers = rows[0]
+                def format_row(values: list[str]) -> str:
+                    line_buffer.seek(0)
+                    line_buffer.truncate()
+                    writer.writerow(values)
+                    return line_buffer.getvalue()
                 
-                for row in rows[1:]:
-                    row_text = ", ".join([f"{headers[i]}: {row[i]}" for i in range(len(row)) if i < len(headers)])
-                    text.append(row_text)
+                def rows() -> Iterator[Optional[str]]:
+                    for row in reader:
+                        if any(value.strip() for value in row):
+                            yield format_row(row)
+                            yield None
                 
-                return "\n".join(text).strip()
+                yield from _pack_lines(rows(), chunk_size, unit, header=format_row(headers))
         except Exception as e:
             raise ValueError(f"Error parsing CSV: {str(e)}")
     
@@ -153,6 +375,48 @@ class FileParser:
         except Exception as e:
             raise ValueError(f"Error parsing JSON: {str(e)}")
     
+    @staticmethod
+    def iter_json_lines(file_path: str) -> Iterator[str]:
+        """
+        Parse JSON file incrementally into path-qualified lines
+        
+        The file is read as a stream of parser events, so memory does not
+        grow with file size and nesting depth is not limited by recursion.
+        
+        Args:
+            file_path: Path to JSON file
+            
+        Yields:
+            One "path: value" line per scalar, e.g. "users[0].name: Alice"
+        """
+        for line in _iter_json_records(file_path):
+            if line is not None:
+                yield line
+    
+    @staticmethod
+    def iter_json_chunks(
+        file_path: str,
+        chunk_size: int = 1000,
+        unit: str = "characters"
+    ) -> Iterator[str]:
+        """
+        Parse JSON file incrementally into chunks of path-qualified lines
+        
+        Chunks are aligned to top-level records (elements of the outermost
+        arrays and entries of a root object): a record is only split across
+        chunks when it does not fit in one on its own, and a value too long
+        for a chunk is split with its path repeated on every piece.
+        
+        Args:
+            file_path: Path to JSON file
+            chunk_size: Maximum characters (or tokens) per chunk
+            unit: "characters" or "tokens"
+            
+        Yields:
+            Text chunks
+        """
+        yield from _pack_lines(_iter_json_records(file_path), chunk_size, unit, line_prefix=_json_line_prefix)
+    
     @staticmethod
     def parse_file(file_path: str) -> str:
         """
@@ -181,16 +445,238 @@ class FileParser:
             return FileParser.parse_json(file_path)
         else:
             raise ValueError(f"Unsupported file type: {ext}")
+    
+    @staticmethod
+    def iter_file(file_path: str) -> Iterator[str]:
+        """
+        Auto-detect file type and parse it as a stream of text segments
+        
+        Formats that support incremental extraction yield text as it is
+        read; the others yield their fully parsed text as one segment.
+        Joining the segments gives the same text as parse_file (up to
+        surrounding whitespace), except for JSON, which is streamed as
+        path-qualified lines (see iter_json_lines).
+        
+        Args:
+            file_path: Path to file
+            
+        Yields:
+            Text segments in document order
+            
+        Raises:
+            ValueError: If file type is not supported
+        """
+        ext = Path(file_path).suffix.lower()
+        
+        if ext == '.pdf':
+            yield from FileParser.iter_pdf_pages(file_path)
+        elif ext == '.docx':
+            for block in FileParser.iter_docx_blocks(file_path):
+                yield block + "\n"
+        elif ext == '.csv':
+            for row in FileParser.iter_csv_rows(file_path):
+                yield row + "\n"
+        elif ext == '.json':
+            for line in FileParser.iter_json_lines(file_path):
+                yield line + "\n"
+        else:
+            yield FileParser.parse_file(file_path)
+
+
+def _iter_json_records(file_path: str) -> Iterator[Optional[str]]:
+    """
+    Flatten a JSON file into path-qualified lines from parser events
+    
+    Args:
+        file_path: Path to JSON file
+        
+    Yields:
+        "path: value" lines, with None after each top-level record
+        (element of an outermost array or entry of a root object)
+    """
+    containers = []   # "map" / "array" for each open container
+    path = []         # Current key (map) or index (array) per container
+    
+    def enter_value() -> None:
+        if containers and containers[-1] == "array":
+            path[-1] += 1
+    
+    def ends_record() -> bool:
+        if not containers:
+            return False
+        if containers[-1] == "map":
+            return len(containers) == 1
+        return containers.count("array") == 1
+    
+    def format_path() -> str:
+        parts = []
+        for component in path:
+            if isinstance(component, int):
+                parts.append(f"[{component}]")
+            else:
+                parts.append(f".{component}" if parts else component)
+        return "".join(parts)
+    
+    try:
+        with open(file_path, 'rb') as f:
+            for _, event, value in ijson.parse(f, use_float=True):
+                if event == "map_key":
+                    path[-1] = value
+                elif event in ("start_map", "start_array"):
+                    enter_value()
+                    containers.append("map" if event == "start_map" else "array")
+                    path.append(None if event == "start_map" else -1)
+                elif event in ("end_map", "end_array"):
+                    containers.pop()
+                    path.pop()
+                    if ends_record():
+                        yield None
+                else:
+                    enter_value()
+                    if event == "null":
+                        value = "null"
+                    elif event == "boolean":
+                        value = "true" if value else "false"
+                    
+                    location = format_path()
+                    yield f"{location}: {value}" if location else str(value)
+                    if ends_record():
+                        yield None
+    except Exception as e:
+        raise ValueError(f"Error parsing JSON: {str(e)}")
 
 
-def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> list[str]:
+def _pack_lines(
+    lines: Iterable[Optional[str]],
+    chunk_size: int,
+    unit: str = "characters",
+    header: Optional[str] = None,
+    line_prefix: Optional[Callable[[str], str]] = None
+) -> Iterator[str]:
+    """
+    Pack a stream of lines into chunks, keeping records together
+    
+    Args:
+        lines: Lines, with None marking the end of each record
+        chunk_size: Maximum characters (or tokens) per chunk
+        unit: "characters" or "tokens"
+        header: Optional line repeated at the top of every chunk
+        line_prefix: Optional function returning the part of a line to
+            repeat on each piece when the line itself has to be split
+        
+    Yields:
+        Text chunks made of whole records where possible; a record larger
+        than chunk_size is split between lines, and a line larger than
+        chunk_size is split into pieces (see _split_line)
+    """
+    measure = count_tokens if unit == "tokens" else len
+    header_size = measure(header) + 1 if header is not None else 0
+    
+    def render(chunk_lines: list[str]) -> str:
+        return "\n".join([header, *chunk_lines] if header is not None else chunk_lines)
+    
+    chunk, used = [], header_size
+    record, record_size = [], 0
+    
+    for line in itertools.chain(lines, [None]):
+        if line is None:
+            if not record:
+                continue
+            if chunk and used + record_size > chunk_size:
+                yield render(chunk)
+                chunk, used = [], header_size
+            chunk.extend(record)
+            used += record_size
+            record, record_size = [], 0
+            continue
+        
+        # Line too large for any chunk: flush what precedes it, then split it
+        if header_size + measure(line) + 1 > chunk_size:
+            if chunk and used + record_size > chunk_size:
+                yield render(chunk)
+                chunk, used = [], header_size
+            chunk.extend(record)
+            if chunk:
+                yield render(chunk)
+            chunk, used = [], header_size
+            record, record_size = [], 0
+            
+            for piece in _split_line(line, chunk_size - header_size, unit, line_prefix):
+                yield render([piece])
+            continue
+        
+        record.append(line)
+        record_size += measure(line) + 1
+        
+        # Record too large for any chunk: flush it line by line
+        if header_size + record_size > chunk_size and len(record) > 1:
+            if chunk:
+                yield render(chunk)
+                chunk, used = [], header_size
+            yield render(record[:-1])
+            record, record_size = [line], measure(line) + 1
+    
+    if chunk:
+        yield render(chunk)
+
+
+def _split_line(
+    line: str,
+    size: int,
+    unit: str = "characters",
+    line_prefix: Optional[Callable[[str], str]] = None
+) -> Iterator[str]:
+    """
+    Split a line that does not fit in a chunk into pieces that do
+    
+    Args:
+        line: Line to split
+        size: Maximum characters (or tokens) per piece, including its newline
+        unit: "characters" or "tokens"
+        line_prefix: Optional function returning the part of the line
+            (e.g. a JSON path) to repeat at the start of every piece
+        
+    Yields:
+        Pieces of the line, each starting with the prefix
+    """
+    measure = count_tokens if unit == "tokens" else len
+    prefix = line_prefix(line) if line_prefix else ""
+    
+    # A prefix that leaves little room for content is dropped rather than repeated
+    if measure(prefix) > size // 2:
+        prefix = ""
+    
+    piece_size = max(1, size - measure(prefix) - 1)
+    for piece in iter_chunks([line[len(prefix):]], piece_size, 0, unit=unit):
+        yield prefix + piece
+
+
+def _json_line_prefix(line: str) -> str:
+    """Path part ("path: ") of a line from _iter_json_records"""
+    separator = line.find(": ")
+    return line[:separator + 2] if separator >= 0 else ""
+
+
+# Greedy matches: .* runs to the end of the window, then backtracks to the
+# last boundary character, so match.end() is the break position
+_LAST_SENTENCE_BREAK = re.compile(r'.*[.!?\n]', re.DOTALL)
+_LAST_WORD_BREAK = re.compile(r'.*\s', re.DOTALL)
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    unit: str = "characters"
+) -> list[str]:
     """
     Split text into overlapping chunks
     
     Args:
         text: Text to split
-        chunk_size: Maximum characters per chunk
-        chunk_overlap: Number of characters to overlap between chunks
+        chunk_size: Maximum characters (or tokens) per chunk
+        chunk_overlap: Number of characters (or tokens) to overlap between chunks
+        unit: "characters" or "tokens"
         
     Returns:
         List of text chunks
@@ -198,33 +684,255 @@ def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> l
     if not text:
         return []
     
-    chunks = []
+    return list(iter_chunks([text], chunk_size, chunk_overlap, strip=False, unit=unit))
+
+
+def iter_chunks(
+    segments: Iterable[str],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    strip: bool = True,
+    unit: str = "characters"
+) -> Iterator[str]:
+    """
+    Split a stream of text segments into overlapping chunks
+    
+    Chunks break at the last sentence boundary (. ! ? or newline) within
+    100 characters of the size limit, else at the last whitespace within
+    50 characters. Boundaries are found with precompiled patterns over a
+    bounded window, and only the text that is still needed is buffered,
+    so chunks are emitted while the source is being read.
+    
+    Args:
+        segments: Text segments in order (e.g. PDF pages)
+        chunk_size: Maximum characters (or tokens) per chunk
+        chunk_overlap: Number of characters (or tokens) to overlap between chunks
+        strip: Chunk the concatenation with surrounding whitespace removed
+        unit: "characters", or "tokens" to size chunks with the embedding
+            model's tokenizer (see iter_token_chunks)
+        
+    Yields:
+        Text chunks
+    """
+    if unit == "tokens":
+        for chunk, _ in iter_token_chunks(segments, chunk_size, chunk_overlap):
+            yield chunk
+        return
+    if unit != "characters":
+        raise ValueError(f"Unsupported chunk unit: {unit}")
+    
+    segments = iter(segments)
+    buffer = ""        # Buffered text, buffer[0] is at text position `base`
+    base = 0
+    content_end = 0    # Text length seen so far (excluding trailing whitespace if strip)
+    exhausted = False
+    leading = strip
     start = 0
-    text_length = len(text)
     
-    while start < text_length:
+    while True:
+        # Read until the text around the furthest possible `end` is available
+        while not exhausted and content_end <= start + chunk_size + 1:
+            segment = next(segments, None)
+            if segment is None:
+                exhausted = True
+                break
+            if leading:
+                segment = segment.lstrip()
+                if not segment:
+                    continue
+                leading = False
+            
+            content_length = len(segment.rstrip()) if strip else len(segment)
+            if content_length:
+                content_end = base + len(buffer) + content_length
+            buffer += segment
+        
+        if exhausted and start >= content_end:
+            return
+        
         end = start + chunk_size
         
         # If this is not the last chunk, try to break at a sentence or word boundary
-        if end < text_length:
-            # Look for sentence boundary (. ! ?)
-            for i in range(end, max(start, end - 100), -1):
-                if text[i] in '.!?\n':
-                    end = i + 1
-                    break
-            else:
-                # Look for word boundary
-                for i in range(end, max(start, end - 50), -1):
-                    if text[i].isspace():
-                        end = i + 1
-                        break
+        if end < content_end:
+            window_end = end + 1 - base
+            match = _LAST_SENTENCE_BREAK.match(buffer, max(start, end - 100) + 1 - base, window_end)
+            if not match:
+                match = _LAST_WORD_BREAK.match(buffer, max(start, end - 50) + 1 - base, window_end)
+            if match:
+                end = match.end() + base
         
-        chunk = text[start:end].strip()
+        chunk = buffer[start - base:min(end, content_end) - base].strip()
         if chunk:
-            chunks.append(chunk)
+            yield chunk
         
         # Move start forward, accounting for overlap
-        start = end - chunk_overlap if end < text_length else text_length
+        start = end - chunk_overlap if end < content_end else content_end
+        
+        # Drop consumed text once it makes up most of the buffer
+        if start - base > len(buffer) // 2:
+            buffer = buffer[start - base:]
+            base = start
+
+
+def _token_break(tokenizer, tokens: list[int], chunk_size: int) -> int:
+    """
+    Find where to end a token chunk
+    
+    Args:
+        tokenizer: tiktoken encoding
+        tokens: Buffered tokens (more than chunk_size)
+        chunk_size: Maximum tokens per chunk
+        
+    Returns:
+        Number of tokens to put in the chunk: just after the last
+        sentence-ending token within the final tenth of the window,
+        else chunk_size
+    """
+    for i in range(chunk_size - 1, chunk_size - 1 - chunk_size // 10, -1):
+        if tokenizer.decode_single_token_bytes(tokens[i]).rstrip(b" ").endswith((b".", b"!", b"?", b"\n")):
+            return i + 1
+    return chunk_size
+
+
+def _utf8_boundary(tokenizer, tokens: list[int], index: int) -> int:
+    """
+    Move a cut position so it does not split a UTF-8 character
+    
+    A character can span up to four byte-level tokens; cutting between
+    them would decode to U+FFFD on both sides.
+    
+    Args:
+        tokenizer: tiktoken encoding
+        tokens: Buffered tokens
+        index: Proposed cut (number of leading tokens)
+        
+    Returns:
+        The nearest cut on a character boundary: at or before index if
+        one exists after the start of the buffer, else after index
+    """
+    def is_boundary(cut: int) -> bool:
+        tail = b"".join(tokenizer.decode_single_token_bytes(token) for token in tokens[max(cut - 4, 0):cut])
+        
+        # Find the last lead byte and check that its character is complete
+        for back in range(1, min(4, len(tail)) + 1):
+            byte = tail[-back]
+            if byte & 0xC0 != 0x80:
+                length = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+                return back >= length
+        return True
     
-    return chunks
+    for cut in itertools.chain(range(index, max(index - 4, 0), -1), range(index + 1, min(index + 4, len(tokens)) + 1)):
+        if is_boundary(cut):
+            return cut
+    return index
 
+
+def iter_token_chunks(
+    segments: Iterable[str],
+    chunk_size: int = 256,
+    chunk_overlap: int = 32
+) -> Iterator[tuple[str, int]]:
+    """
+    Split a stream of text segments into overlapping token-sized chunks
+    
+    Each segment is encoded once with the (cached) embedding tokenizer and
+    chunks are cut from the token stream, never inside a multi-byte
+    character. A chunk is only re-tokenized when stripping whitespace
+    changed it, so its token count matches its final text.
+    
+    Args:
+        segments: Text segments in order (e.g. PDF pages)
+        chunk_size: Maximum tokens per chunk
+        chunk_overlap: Number of tokens to overlap between chunks
+        
+    Yields:
+        Tuples of (chunk_text, token_count)
+    """
+    tokenizer = get_tokenizer()
+    tokens: list[int] = []
+    covered = 0  # Leading buffered tokens already emitted in a chunk
+    
+    def emit(window: list[int]) -> Optional[tuple[str, int]]:
+        text = tokenizer.decode(window)
+        chunk = text.strip()
+        if not chunk:
+            return None
+        return chunk, len(window) if chunk == text else len(tokenizer.encode(chunk, disallowed_special=()))
+    
+    for segment in segments:
+        tokens.extend(tokenizer.encode(segment, disallowed_special=()))
+        
+        while len(tokens) > chunk_size:
+            end = _utf8_boundary(tokenizer, tokens, _token_break(tokenizer, tokens, chunk_size))
+            result = emit(tokens[:end])
+            if result:
+                yield result
+            
+            # Move forward, accounting for overlap
+            advance = max(_utf8_boundary(tokenizer, tokens, max(end - chunk_overlap, 1)), 1)
+            del tokens[:advance]
+            covered = end - advance
+    
+    if len(tokens) > covered:
+        result = emit(tokens)
+        if result:
+            yield result
+
+
+def iter_document_chunks(file_path: str, content_hash: Optional[str] = None) -> Iterator[tuple[str, Optional[int]]]:
+    """
+    Parse a file and chunk it as a stream using the configured chunk unit
+    
+    CSV and JSON files are chunked as groups of whole records (rows under
+    their header, top-level JSON elements); other formats go through the
+    text chunker, reading extracted text from the text cache when the
+    same content was parsed before.
+    
+    Token counts only size requests to a remote embedding provider, so
+    with EMBEDDING_PROVIDER=local and character chunks nothing is
+    tokenized and the tokenizer never has to be downloaded.
+    
+    Args:
+        file_path: Path to file
+        content_hash: SHA-256 of the file, computed if not given
+        
+    Yields:
+        Tuples of (chunk_text, token_count), token_count None when not counted
+    """
+    ext = Path(file_path).suffix.lower()
+    
+    measure = count_tokens if settings.EMBEDDING_PROVIDER != "local" else (lambda chunk: None)
+    
+    if ext in ('.csv', '.json'):
+        record_chunks = FileParser.iter_csv_chunks if ext == '.csv' else FileParser.iter_json_chunks
+        tokens = settings.CHUNK_UNIT == "tokens"
+        for chunk in record_chunks(
+            file_path,
+            chunk_size=settings.CHUNK_TOKEN_SIZE if tokens else settings.CHUNK_SIZE,
+            unit=settings.CHUNK_UNIT
+        ):
+            yield chunk, measure(chunk)
+        return
+    
+    if settings.TEXT_CACHE_ENABLED:
+        content_hash = content_hash or file_sha256(file_path)
+        segments = cached_segments(
+            f"{content_hash}-v{PARSER_VERSION}{ext}",
+            lambda: FileParser.iter_file(file_path)
+        )
+    else:
+        segments = FileParser.iter_file(file_path)
+    
+    if settings.CHUNK_UNIT == "tokens":
+        yield from iter_token_chunks(
+            segments,
+            chunk_size=settings.CHUNK_TOKEN_SIZE,
+            chunk_overlap=settings.CHUNK_TOKEN_OVERLAP
+        )
+    else:
+        for chunk in iter_chunks(
+            segments,
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP
+        ):
+            yield chunk, measure(chunk)
@@ -2,58 +2,348 @@
 Qdrant Client Configuration
 """
 
+import os
+import threading
+import time
+import uuid
+import zlib
+from typing import List, Optional
+
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    VectorParamsDiff,
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    QuantizationSearchParams,
+    SearchParams,
+    Disabled,
+    PayloadSchemaType,
+    Filter,
+    FieldCondition,
+    MatchValue
+)
 
 from app.config import settings
 
 
-def get_qdrant_client() -> QdrantClient:
+_client: Optional[QdrantClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def create_qdrant_client() -> QdrantClient:
     """
-    Create and return Qdrant client instance
+    Create a new Qdrant client instance
+    
+    Uses gRPC on QDRANT_GRPC_PORT when QDRANT_PREFER_GRPC is set, REST otherwise.
     """
-    client = QdrantClient(
+    return QdrantClient(
         host=settings.QDRANT_HOST,
         port=settings.QDRANT_PORT,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
         https=False
     )
-    return client
 
 
-def create_collection_if_not_exists(collection_name: str, vector_size: int = 1536):
+def get_qdrant_client() -> QdrantClient:
     """
-    Create a Qdrant collection if it doesn't exist
+    Return the process-wide Qdrant client, creating it on first use
+    
+    The client keeps its connections open and is safe to share between
+    threads. A client inherited across fork() (Celery prefork workers) is
+    never reused; the child creates its own on first use.
+    """
+    global _client, _client_pid
+    
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = create_qdrant_client()
+                _client_pid = pid
+    return _client
+
+
+class CollectionRegistry:
+    """
+    Per-process cache of collections known to exist, with their vector size
+    
+    Entries expire after QDRANT_COLLECTION_CACHE_TTL seconds so collections
+    dropped by another process are noticed eventually. Only existence is
+    cached; a missing collection is always checked against Qdrant.
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[Optional[int], float]] = {}
+        self._lock = threading.Lock()
+    
+    def _live_entry(self, collection_name: str) -> Optional[tuple[Optional[int], float]]:
+        entry = self._entries.get(collection_name)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry
+    
+    def contains(self, collection_name: str) -> bool:
+        """Whether the collection is known to exist"""
+        return self._live_entry(collection_name) is not None
+    
+    def get_vector_size(self, collection_name: str) -> Optional[int]:
+        """Cached vector size of the collection, None if not cached"""
+        entry = self._live_entry(collection_name)
+        return entry[0] if entry is not None else None
+    
+    def remember(self, collection_name: str, vector_size: Optional[int] = None) -> None:
+        with self._lock:
+            self._entries[collection_name] = (vector_size, time.monotonic() + self.ttl)
+    
+    def forget(self, collection_name: str) -> None:
+        with self._lock:
+            self._entries.pop(collection_name, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+collection_registry = CollectionRegistry(ttl=settings.QDRANT_COLLECTION_CACHE_TTL)
+
+
+def _reset_client_after_fork() -> None:
+    """Drop the parent's client in a forked child without closing its connections"""
+    global _client, _client_pid, _client_lock
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+    collection_registry._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client_after_fork)
+
+
+def _error_matches(error: Exception, status_code: int, grpc_code: str, messages: tuple[str, ...]) -> bool:
+    """Match a REST (UnexpectedResponse) or gRPC (RpcError) error by status or message"""
+    if getattr(error, "status_code", None) == status_code:
+        return True
+    code = getattr(error, "code", None)
+    if callable(code) and getattr(code(), "name", None) == grpc_code:
+        return True
+    # Qdrant reports some conflicts as a generic bad request, so check the message too
+    text = str(error).lower()
+    return any(message in text for message in messages)
+
+
+def is_already_exists_error(error: Exception) -> bool:
+    return _error_matches(error, 409, "ALREADY_EXISTS", ("already exists",))
+
+
+def is_not_found_error(error: Exception) -> bool:
+    return _error_matches(error, 404, "NOT_FOUND", ("not found", "doesn't exist", "does not exist"))
+
+
+# Payload fields filtered on by QdrantService (document filters, chat/document split)
+INDEXED_PAYLOAD_FIELDS = ("document_id", "type")
+
+_PROFILE_DEFAULTS = {
+    "hnsw_m": 16,
+    "hnsw_ef_construct": 100,
+    "on_disk": False,
+    "quantization": None,
+    "rescore": True,
+    "oversampling": 2.0
+}
+
+
+def get_collection_profile() -> dict:
+    """
+    Get the active collection profile (QDRANT_COLLECTION_PROFILE)
+    
+    Returns:
+        Profile settings, with defaults for keys the profile leaves out
+    """
+    name = settings.QDRANT_COLLECTION_PROFILE
+    if name not in settings.QDRANT_COLLECTION_PROFILES:
+        raise ValueError(f"Unknown Qdrant collection profile: {name}")
+    return {**_PROFILE_DEFAULTS, **settings.QDRANT_COLLECTION_PROFILES[name]}
+
+
+def _is_multitenant(multitenant: Optional[bool]) -> bool:
+    if multitenant is None:
+        return settings.QDRANT_COLLECTION_LAYOUT == "shared"
+    return multitenant
+
+
+def _hnsw_config(profile: dict, multitenant: bool) -> HnswConfigDiff:
+    # Multi-tenant collections build the graph per tenant (payload_m) instead
+    # of across all points (m=0), since every query on them filters by user_id
+    if multitenant:
+        return HnswConfigDiff(m=0, payload_m=profile["hnsw_m"], ef_construct=profile["hnsw_ef_construct"])
+    return HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["hnsw_ef_construct"])
+
+
+def _quantization_config(profile: dict) -> Optional[ScalarQuantization]:
+    if profile["quantization"] != "int8":
+        return None
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8,
+            quantile=0.99,
+            always_ram=True
+        )
+    )
+
+
+def _create_payload_indexes(client: QdrantClient, collection_name: str, multitenant: bool) -> None:
+    """Create keyword indexes on filtered payload fields (a no-op if they exist)"""
+    fields = (("user_id",) if multitenant else ()) + INDEXED_PAYLOAD_FIELDS
+    for field_name in fields:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=PayloadSchemaType.KEYWORD
+        )
+
+
+def get_search_params() -> Optional[SearchParams]:
+    """
+    Search parameters for the active profile
+    
+    Returns:
+        Rescoring parameters for quantized profiles, None otherwise
+    """
+    profile = get_collection_profile()
+    if _quantization_config(profile) is None:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=profile["rescore"],
+            oversampling=profile["oversampling"]
+        )
+    )
+
+
+def create_collection(collection_name: str, vector_size: int, multitenant: Optional[bool] = None, recreate: bool = False) -> None:
+    """
+    Create (or recreate) a Qdrant collection with the active profile
     
     Args:
         collection_name: Name of the collection
-        vector_size: Size of the embedding vectors (default: 1536 for text-embedding-3-small)
+        vector_size: Size of the embedding vectors
+        multitenant: Configure for tenant-filtered access (default: shared layout)
+        recreate: Drop an existing collection of the same name first
     """
+    multitenant = _is_multitenant(multitenant)
+    profile = get_collection_profile()
+    
     client = get_qdrant_client()
+    create = client.recreate_collection if recreate else client.create_collection
+    create(
+        collection_name=collection_name,
+        vectors_config=VectorParams(
+            size=vector_size,
+            distance=Distance.COSINE,
+            on_disk=profile["on_disk"]
+        ),
+        hnsw_config=_hnsw_config(profile, multitenant),
+        quantization_config=_quantization_config(profile)
+    )
+    _create_payload_indexes(client, collection_name, multitenant)
     
-    try:
-        # Check if collection exists
-        collections = client.get_collections()
-        existing_collections = [col.name for col in collections.collections]
+    collection_registry.remember(collection_name, vector_size)
+
+
+def apply_collection_profile(collection_name: str, multitenant: Optional[bool] = None) -> None:
+    """
+    Bring an existing collection in line with the active profile
+    
+    Adds missing payload indexes and updates HNSW, on-disk and quantization
+    settings in place; Qdrant rebuilds the affected segments in the
+    background while the collection stays searchable.
+    
+    Args:
+        collection_name: Name of the collection
+        multitenant: Configure for tenant-filtered access (default: shared layout)
+    """
+    multitenant = _is_multitenant(multitenant)
+    profile = get_collection_profile()
+    client = get_qdrant_client()
+    
+    _create_payload_indexes(client, collection_name, multitenant)
+    client.update_collection(
+        collection_name=collection_name,
+        # "" addresses the collection's single unnamed vector
+        vectors_config={"": VectorParamsDiff(on_disk=profile["on_disk"])},
+        hnsw_config=_hnsw_config(profile, multitenant),
+        quantization_config=_quantization_config(profile) or Disabled.DISABLED
+    )
+
+
+def create_collection_if_not_exists(collection_name: str, vector_size: int = 1536, multitenant: Optional[bool] = None) -> bool:
+    """
+    Create a Qdrant collection if it doesn't exist
+    
+    Known collections are answered from the registry. Otherwise the
+    collection is created directly, and an "already exists" error (another
+    worker won the race, or it predates this process) counts as success.
+    
+    Args:
+        collection_name: Name of the collection
+        vector_size: Size of the embedding vectors (default: 1536 for text-embedding-3-small)
+        multitenant: Configure for tenant-filtered access (default: shared layout)
         
-        if collection_name not in existing_collections:
-            # Create collection
-            client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(
-                    size=vector_size,
-                    distance=Distance.COSINE
-                )
-            )
-            return True
+    Returns:
+        True if the collection was created by this call
+    """
+    if collection_registry.contains(collection_name):
         return False
+    
+    try:
+        create_collection(collection_name, vector_size, multitenant=multitenant)
+        return True
     except Exception as e:
+        if is_already_exists_error(e):
+            collection_registry.remember(collection_name)
+            return False
         print(f"Error creating Qdrant collection: {e}")
         raise
 
 
-def get_collection_name(user_id: str) -> str:
+def get_collection_vector_size(collection_name: str) -> Optional[int]:
     """
-    Generate collection name for a user
+    Get the vector size of a collection
+    
+    Args:
+        collection_name: Name of the collection
+        
+    Returns:
+        Vector size, or None if the collection does not exist
+    """
+    vector_size = collection_registry.get_vector_size(collection_name)
+    if vector_size is not None:
+        return vector_size
+    
+    try:
+        info = get_qdrant_client().get_collection(collection_name)
+    except Exception as e:
+        if is_not_found_error(e):
+            collection_registry.forget(collection_name)
+            return None
+        raise
+    
+    vector_size = info.config.params.vectors.size
+    collection_registry.remember(collection_name, vector_size)
+    return vector_size
+
+
+def get_user_collection_name(user_id: str) -> str:
+    """
+    Generate the per-user collection name for a user
     
     Args:
         user_id: User's UUID
@@ -63,3 +353,85 @@ def get_collection_name(user_id: str) -> str:
     """
     return f"user_{user_id}_documents"
 
+
+def get_shared_collection_name(user_id: str) -> str:
+    """
+    Generate the shared collection name holding a user's points
+    
+    With QDRANT_SHARED_COLLECTION_SHARDS > 1, users are spread over that many
+    collections by a stable hash of their ID.
+    
+    Args:
+        user_id: User's UUID
+        
+    Returns:
+        Collection name in format: {QDRANT_SHARED_COLLECTION} or {QDRANT_SHARED_COLLECTION}_{shard}
+    """
+    shards = settings.QDRANT_SHARED_COLLECTION_SHARDS
+    if shards <= 1:
+        return settings.QDRANT_SHARED_COLLECTION
+    return f"{settings.QDRANT_SHARED_COLLECTION}_{zlib.crc32(str(user_id).encode()) % shards}"
+
+
+def get_collection_name(user_id: str) -> str:
+    """
+    Generate collection name for a user under the configured layout
+    
+    Args:
+        user_id: User's UUID
+        
+    Returns:
+        Per-user collection name, or the shared collection name when
+        QDRANT_COLLECTION_LAYOUT is "shared"
+    """
+    if settings.QDRANT_COLLECTION_LAYOUT == "shared":
+        return get_shared_collection_name(user_id)
+    return get_user_collection_name(user_id)
+
+
+# Namespace for chunk point IDs; changing it would orphan existing points
+CHUNK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "documind-ai/document-chunks")
+
+
+def get_chunk_point_id(document_id, chunk_index: int) -> str:
+    """
+    Generate the point ID of a document chunk
+    
+    IDs are derived from (document_id, chunk_index), so storing the same
+    chunk again overwrites it instead of adding a duplicate.
+    
+    Args:
+        document_id: Document UUID
+        chunk_index: Position of the chunk in the document
+        
+    Returns:
+        UUID string
+    """
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{document_id}:{chunk_index}"))
+
+
+def get_tenant_filter(
+    user_id: str,
+    *conditions: FieldCondition,
+    must_not: Optional[List[FieldCondition]] = None
+) -> Optional[Filter]:
+    """
+    Build a query filter scoped to a user
+    
+    In the shared layout every request must carry the user_id condition;
+    per-user collections are already isolated.
+    
+    Args:
+        user_id: User's UUID
+        conditions: Additional conditions that must all match
+        must_not: Conditions that must not match
+        
+    Returns:
+        Filter, or None if there is nothing to filter on
+    """
+    must = list(conditions)
+    if settings.QDRANT_COLLECTION_LAYOUT == "shared":
+        must.insert(0, FieldCondition(key="user_id", match=MatchValue(value=str(user_id))))
+    if not must and not must_not:
+        return None
+    return Filter(must=must or None, must_not=must_not)
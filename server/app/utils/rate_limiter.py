@@ -0,0 +1,211 @@
+"""
+Rate Limiter
+Cluster-wide token-bucket governor for embeddings API calls, shared through Redis
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+
+import redis
+
+from app.config import settings
+
+
+# Refill both buckets from Redis server time, then take from both or neither.
+# Returns 0 when granted, otherwise the milliseconds until the request fits.
+_RESERVE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local levels = {}
+local wait = 0
+
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[3 * i - 2])
+    local capacity = tonumber(ARGV[3 * i - 1])
+    local cost = tonumber(ARGV[3 * i])
+    local state = redis.call('HMGET', key, 'level', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(0, now - ts) * rate)
+    levels[i] = level
+    local needed = math.min(cost, capacity)
+    if level < needed then
+        wait = math.max(wait, math.ceil((needed - level) / rate))
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local level = levels[i]
+    if wait == 0 then
+        level = level - tonumber(ARGV[3 * i])
+    end
+    local capacity = tonumber(ARGV[3 * i - 1])
+    local rate = tonumber(ARGV[3 * i - 2])
+    redis.call('HSET', key, 'level', level, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil((capacity - level) / rate) + 1000)
+end
+
+return wait
+"""
+
+
+class RateLimiter:
+    """
+    Token bucket on requests and tokens per minute, shared by all workers
+    
+    Each call reserves one request and its token count from two Redis
+    buckets atomically, or sleeps until they have refilled enough. Buckets
+    refill at EMBEDDING_RATE_HEADROOM of the configured limits and hold at
+    most EMBEDDING_RATE_BURST_SECONDS of refill, so aggregate throughput
+    stays just under the provider limits. A request larger than a bucket
+    is admitted once the bucket is full and drives it into debt.
+    """
+    
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int):
+        """
+        Args:
+            name: Redis key prefix shared by all processes
+            requests_per_minute: Request limit (0 = unlimited)
+            tokens_per_minute: Token limit (0 = unlimited)
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        
+        self._redis: Optional[redis.Redis] = None
+        self._script = None
+        self._lock = threading.Lock()
+        
+        self.acquisitions = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.requests_per_minute > 0 or self.tokens_per_minute > 0
+    
+    def _get_script(self):
+        if self._script is None:
+            self._redis = redis.Redis.from_url(settings.REDIS_URL)
+            self._script = self._redis.register_script(_RESERVE_SCRIPT)
+        return self._script
+    
+    def _buckets(self, tokens: int) -> tuple[list, list]:
+        """Build script keys and (rate per ms, capacity, cost) args for the active limits"""
+        keys, args = [], []
+        for bucket, limit, cost in (
+            ("requests", self.requests_per_minute, 1),
+            ("tokens", self.tokens_per_minute, tokens),
+        ):
+            if limit <= 0:
+                continue
+            rate = limit * settings.EMBEDDING_RATE_HEADROOM / 60000
+            capacity = max(1.0, rate * settings.EMBEDDING_RATE_BURST_SECONDS * 1000)
+            keys.append(f"ratelimit:{self.name}:{bucket}")
+            args.extend([rate, capacity, cost])
+        return keys, args
+    
+    def _reserve(self, tokens: int) -> float:
+        """
+        Try to take one request and tokens from the buckets
+        
+        Args:
+            tokens: Tokens the request will consume
+        
+        Returns:
+            Seconds to wait before retrying, 0 if granted
+        """
+        keys, args = self._buckets(tokens)
+        try:
+            return self._get_script()(keys=keys, args=args) / 1000
+        except redis.RedisError as e:
+            print(f"Rate limiter unavailable, not throttling: {e}")
+            return 0
+    
+    def _record(self, waited: float) -> None:
+        with self._lock:
+            self.acquisitions += 1
+            self.wait_seconds += waited
+            if waited > 0:
+                self.delayed += 1
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+    
+    @staticmethod
+    def _backoff(wait: float) -> float:
+        # Jitter spreads out waiters that were refused at the same moment
+        return wait * random.uniform(1.0, 1.2)
+    
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block until a request of the given size may be sent
+        
+        Args:
+            tokens: Tokens the request will consume
+        
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+        
+        started = time.monotonic()
+        while True:
+            wait = self._reserve(tokens)
+            if not wait:
+                break
+            time.sleep(self._backoff(wait))
+        
+        waited = time.monotonic() - started
+        self._record(waited)
+        return waited
+    
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Wait without blocking the event loop until a request may be sent
+        
+        Args:
+            tokens: Tokens the request will consume
+        
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+        
+        started = time.monotonic()
+        while True:
+            wait = await asyncio.to_thread(self._reserve, tokens)
+            if not wait:
+                break
+            await asyncio.sleep(self._backoff(wait))
+        
+        waited = time.monotonic() - started
+        self._record(waited)
+        return waited
+    
+    def stats(self) -> dict:
+        """
+        Queue-wait metrics of this process
+        
+        Returns:
+            Dictionary with acquisition count, delayed count and wait times
+        """
+        with self._lock:
+            return {
+                "acquisitions": self.acquisitions,
+                "delayed": self.delayed,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+                "avg_wait_seconds": round(self.wait_seconds / self.acquisitions, 3) if self.acquisitions else 0.0,
+            }
+
+
+embedding_rate_limiter = RateLimiter(
+    name="embeddings",
+    requests_per_minute=settings.EMBEDDING_RATE_LIMIT_RPM,
+    tokens_per_minute=settings.EMBEDDING_RATE_LIMIT_TPM
+)
@@ -0,0 +1,171 @@
+"""
+Extracted Text Cache
+Persist parsed document text on disk, keyed by content hash
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from app.config import settings
+
+
+class CorruptCacheEntryError(Exception):
+    """
+    A cache entry turned out to be corrupt after some of its segments were
+    used; the entry is deleted, so processing again re-parses the file
+    """
+
+
+def file_sha256(file_path: str, block_size: int = 1048576) -> str:
+    """
+    Compute the SHA-256 digest of a file without loading it in memory
+    
+    Args:
+        file_path: Path to file
+        block_size: Bytes read per block
+        
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_cache_path(key: str) -> Path:
+    """
+    Get the cache file path for a key
+    
+    Args:
+        key: Cache key
+        
+    Returns:
+        Path of the gzip-compressed JSON-lines entry
+    """
+    return Path(settings.TEXT_CACHE_DIR) / key[:2] / f"{key}.jsonl.gz"
+
+
+def cached_segments(key: str, produce: Callable[[], Iterable[str]]) -> Iterator[str]:
+    """
+    Yield text segments from the cache, or produce and cache them
+    
+    On a miss the segments are streamed to the caller while being written
+    to a temporary file that is moved into place once complete. If the
+    caller stops early (e.g. a failed embedding call), the remaining
+    segments are still written so that a retry skips parsing; if producing
+    fails, nothing is cached. A corrupt entry is deleted and treated as a
+    miss, or raises CorruptCacheEntryError if segments were already yielded. Each new entry triggers eviction (see evict).
+    
+    Args:
+        key: Cache key (content hash, parser version, ...)
+        produce: Callable returning the segments on a cache miss
+        
+    Yields:
+        Text segments in order
+    """
+    if not settings.TEXT_CACHE_ENABLED:
+        yield from produce()
+        return
+    
+    path = get_cache_path(key)
+    
+    if path.exists():
+        yielded = False
+        try:
+            # The modification time records last use for eviction
+            os.utime(path)
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    segment = json.loads(line)
+                    yielded = True
+                    yield segment
+            return
+        except (OSError, EOFError, ValueError) as e:
+            path.unlink(missing_ok=True)
+            if yielded:
+                raise CorruptCacheEntryError(f"Corrupt text cache entry {path.name}: {str(e)}")
+            # Nothing used yet: parse the file as on a miss
+            print(f"Discarding corrupt text cache entry {path.name}: {e}")
+    
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.parent / f"{path.name}.{uuid.uuid4().hex}.tmp"
+    stopped = False
+    
+    try:
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            for segment in produce():
+                f.write(json.dumps(segment) + "\n")
+                if not stopped:
+                    try:
+                        yield segment
+                    except GeneratorExit:
+                        stopped = True
+        temp_path.replace(path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    
+    evict()
+
+
+def remove_entries(content_hash: str) -> int:
+    """
+    Delete every cache entry of a content hash (all parser versions)
+    
+    Args:
+        content_hash: Hex SHA-256 of the file
+        
+    Returns:
+        Number of entries deleted
+    """
+    removed = 0
+    for path in (Path(settings.TEXT_CACHE_DIR) / content_hash[:2]).glob(f"{content_hash}-*.jsonl.gz"):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def evict() -> int:
+    """
+    Delete entries unused for TEXT_CACHE_MAX_AGE_DAYS, then the least
+    recently used ones until the cache fits in TEXT_CACHE_MAX_SIZE_MB
+    
+    Returns:
+        Number of entries deleted
+    """
+    max_age = settings.TEXT_CACHE_MAX_AGE_DAYS * 86400
+    max_size = settings.TEXT_CACHE_MAX_SIZE_MB * 1024 * 1024
+    if not max_age and not max_size:
+        return 0
+    
+    entries = []
+    for path in Path(settings.TEXT_CACHE_DIR).glob("*/*.jsonl.gz"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    
+    # Oldest first
+    entries.sort(key=lambda entry: entry[0])
+    total = sum(size for _, size, _ in entries)
+    now = time.time()
+    removed = 0
+    
+    for mtime, size, path in entries:
+        expired = max_age and now - mtime > max_age
+        if not expired and (not max_size or total <= max_size):
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    
+    return removed
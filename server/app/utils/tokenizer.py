@@ -0,0 +1,58 @@
+"""
+Tokenizer Utilities
+Count and encode text in model tokens
+"""
+
+from functools import lru_cache
+from typing import List, Optional
+
+import tiktoken
+
+from app.config import settings
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model: Optional[str] = None) -> tiktoken.Encoding:
+    """
+    Get (cached) tokenizer for a model
+    
+    Args:
+        model: Model name (default: embedding model)
+        
+    Returns:
+        tiktoken encoding, cl100k_base if the model is unknown
+    """
+    try:
+        return tiktoken.encoding_for_model(model or settings.OPENAI_EMBEDDING_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def encode(text: str, model: Optional[str] = None) -> List[int]:
+    """
+    Encode text into tokens
+    
+    Special-token markers in the text are encoded as plain text.
+    
+    Args:
+        text: Text to encode
+        model: Model name (default: embedding model)
+        
+    Returns:
+        Token IDs
+    """
+    return get_tokenizer(model).encode(text, disallowed_special=())
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count tokens in text
+    
+    Args:
+        text: Text to count
+        model: Model name (default: embedding model)
+        
+    Returns:
+        Number of tokens
+    """
+    return len(encode(text, model))
@@ -0,0 +1,162 @@
+"""
+Chunking Benchmark
+Compare the streaming chunk engine against the original chunk_text
+
+Usage (from server/):
+    python -m benchmarks.chunking_benchmark
+    python -m benchmarks.chunking_benchmark --sizes 1 10 100 --chunk-size 1000 --chunk-overlap 200
+"""
+
+import argparse
+import random
+import time
+
+from app.utils.file_parser import chunk_text, iter_chunks
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> list[str]:
+    """
+    Original chunk_text implementation (character-by-character backward scan)
+    
+    Args:
+        text: Text to split
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Number of characters to overlap between chunks
+        
+    Returns:
+        List of text chunks
+    """
+    if not text:
+        return []
+    
+    chunks = []
+    start = 0
+    text_length = len(text)
+    
+    while start < text_length:
+        end = start + chunk_size
+        
+        if end < text_length:
+            for i in range(end, max(start, end - 100), -1):
+                if text[i] in '.!?\n':
+                    end = i + 1
+                    break
+            else:
+                for i in range(end, max(start, end - 50), -1):
+                    if text[i].isspace():
+                        end = i + 1
+                        break
+        
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        
+        start = end - chunk_overlap if end < text_length else text_length
+    
+    return chunks
+
+
+def build_corpus(size_mb: int, seed: int = 42) -> list[str]:
+    """
+    Build a synthetic corpus as a list of page-sized segments
+    
+    Mixes prose, long unbroken tokens and CSV-like lines so that both the
+    sentence and the word boundary searches are exercised.
+    
+    Args:
+        size_mb: Approximate corpus size in megabytes
+        seed: Random seed
+        
+    Returns:
+        List of text segments (about 4KB each)
+    """
+    rng = random.Random(seed)
+    words = ["document", "vector", "search", "chunk", "embedding", "the", "of", "and", "a", "retrieval"]
+    target = size_mb * 1024 * 1024
+    segments = []
+    total = 0
+    
+    while total < target:
+        parts = []
+        length = 0
+        while length < 4096:
+            kind = rng.random()
+            if kind < 0.7:
+                part = " ".join(rng.choice(words) for _ in range(rng.randint(5, 25))) + rng.choice(".!?") + " "
+            elif kind < 0.9:
+                part = ",".join(str(rng.randint(0, 99999)) for _ in range(8)) + "\n"
+            else:
+                part = "x" * rng.randint(100, 400) + " "
+            parts.append(part)
+            length += len(part)
+        segment = "".join(parts)
+        segments.append(segment)
+        total += len(segment)
+    
+    return segments
+
+
+def _timed(func, *args) -> tuple[float, list[str]]:
+    """Run func(*args) and return (seconds, result)"""
+    started = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started, result
+
+
+def run(sizes: list[int], chunk_size: int, chunk_overlap: int, skip_legacy_above: int) -> None:
+    """
+    Run the benchmark and print a results table
+    
+    Args:
+        sizes: Corpus sizes in megabytes
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Number of characters to overlap between chunks
+        skip_legacy_above: Skip the legacy implementation above this size (MB)
+    """
+    print(f"chunk_size={chunk_size} chunk_overlap={chunk_overlap}")
+    print(f"{'size':>8} {'chunks':>10} {'legacy MB/s':>12} {'chunk_text MB/s':>16} {'iter_chunks MB/s':>17} {'speedup':>8}")
+    
+    for size_mb in sizes:
+        segments = build_corpus(size_mb)
+        text = "".join(segments).strip()
+        
+        new_seconds, new_chunks = _timed(chunk_text, text, chunk_size, chunk_overlap)
+        stream_seconds, stream_chunks = _timed(
+            lambda: list(iter_chunks(segments, chunk_size, chunk_overlap))
+        )
+        if stream_chunks != new_chunks:
+            raise AssertionError(f"iter_chunks output differs from chunk_text at {size_mb}MB")
+        
+        legacy = "skipped"
+        speedup = "-"
+        if size_mb <= skip_legacy_above:
+            legacy_seconds, legacy_chunks = _timed(legacy_chunk_text, text, chunk_size, chunk_overlap)
+            if legacy_chunks != new_chunks:
+                raise AssertionError(f"chunk_text output differs from legacy at {size_mb}MB")
+            legacy = f"{size_mb / legacy_seconds:.1f}"
+            speedup = f"{legacy_seconds / new_seconds:.1f}x"
+        
+        print(
+            f"{size_mb:>6}MB {len(new_chunks):>10} {legacy:>12} "
+            f"{size_mb / new_seconds:>16.1f} {size_mb / stream_seconds:>17.1f} {speedup:>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark text chunking implementations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Corpus sizes in MB")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument(
+        "--skip-legacy-above",
+        type=int,
+        default=100,
+        help="Skip the legacy implementation for corpora larger than this (MB)"
+    )
+    args = parser.parse_args()
+    
+    run(args.sizes, args.chunk_size, args.chunk_overlap, args.skip_legacy_above)
+
+
+if __name__ == "__main__":
+    main()
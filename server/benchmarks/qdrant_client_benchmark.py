@@ -0,0 +1,127 @@
+"""
+Qdrant Client Benchmark
+Compare a fresh Qdrant client per call against the shared process-wide client
+
+Needs a running Qdrant (QDRANT_HOST / QDRANT_PORT / QDRANT_GRPC_PORT).
+
+Usage (from server/):
+    python -m benchmarks.qdrant_client_benchmark
+    python -m benchmarks.qdrant_client_benchmark --queries 500 --dimension 1536
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from app.config import settings
+
+
+def _client(prefer_grpc: bool) -> QdrantClient:
+    return QdrantClient(
+        host=settings.QDRANT_HOST,
+        port=settings.QDRANT_PORT,
+        grpc_port=settings.QDRANT_GRPC_PORT,
+        prefer_grpc=prefer_grpc,
+        https=False
+    )
+
+
+def _query(client: QdrantClient, collection_name: str, vector: list[float]) -> None:
+    """One chat-style request: the collection check plus a top-5 search"""
+    client.get_collection(collection_name)
+    client.search(collection_name=collection_name, query_vector=vector, limit=5)
+
+
+def _measure(queries: list[list[float]], collection_name: str, prefer_grpc: bool, shared: bool) -> list[float]:
+    """
+    Time each query in milliseconds
+    
+    Args:
+        queries: Query vectors
+        collection_name: Collection to search
+        prefer_grpc: Use gRPC instead of REST
+        shared: Reuse one client for all queries instead of one per query
+    
+    Returns:
+        Latency of each query in milliseconds
+    """
+    latencies = []
+    client = _client(prefer_grpc) if shared else None
+    
+    for vector in queries:
+        started = time.perf_counter()
+        if shared:
+            _query(client, collection_name, vector)
+        else:
+            fresh = _client(prefer_grpc)
+            _query(fresh, collection_name, vector)
+            fresh.close()
+        latencies.append((time.perf_counter() - started) * 1000)
+    
+    if client is not None:
+        client.close()
+    return latencies
+
+
+def run(queries: int, dimension: int, points: int) -> None:
+    """
+    Run the benchmark against a temporary collection and print a results table
+    
+    Args:
+        queries: Queries per configuration
+        dimension: Vector dimension
+        points: Points in the temporary collection
+    """
+    rng = random.Random(42)
+    collection_name = f"benchmark_{uuid.uuid4().hex[:8]}"
+    setup = _client(prefer_grpc=False)
+    setup.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(size=dimension, distance=Distance.COSINE)
+    )
+    
+    try:
+        setup.upsert(
+            collection_name=collection_name,
+            points=[
+                PointStruct(id=i, vector=[rng.random() for _ in range(dimension)], payload={"chunk_index": i})
+                for i in range(points)
+            ]
+        )
+        query_vectors = [[rng.random() for _ in range(dimension)] for _ in range(queries)]
+        
+        print(f"queries={queries} dimension={dimension} points={points}")
+        print(f"{'transport':>10} {'client':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+        
+        for transport, prefer_grpc in (("rest", False), ("grpc", True)):
+            for label, shared in (("fresh", False), ("shared", True)):
+                # Warm up the server (caches, gRPC channel setup) before measuring
+                _measure(query_vectors[:5], collection_name, prefer_grpc, shared)
+                latencies = sorted(_measure(query_vectors, collection_name, prefer_grpc, shared))
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                print(
+                    f"{transport:>10} {label:>8} {statistics.median(latencies):>8.2f} "
+                    f"{p95:>8.2f} {statistics.fmean(latencies):>8.2f}"
+                )
+    finally:
+        setup.delete_collection(collection_name)
+        setup.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Qdrant client construction per query")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--points", type=int, default=1000)
+    args = parser.parse_args()
+    
+    run(args.queries, args.dimension, args.points)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Maintenance scripts for DocuMind AI backend
+"""
@@ -0,0 +1,143 @@
+"""
+Migrate to Shared Collection
+Move per-user collections (user_{id}_documents) into the shared multi-tenant
+collection used by QDRANT_COLLECTION_LAYOUT=shared
+
+Points keep their IDs and payloads (chat history rows reference them), so the
+migration can be re-run safely after an interruption. Set
+QDRANT_COLLECTION_LAYOUT=shared once it has completed.
+
+Usage (from server/):
+    python -m scripts.migrate_to_shared_collection
+    python -m scripts.migrate_to_shared_collection --user-id <uuid> --drop-source
+"""
+
+import argparse
+import uuid
+
+from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
+
+from app.database import SessionLocal
+from app.models.document import Document
+from app.models.user import User
+from app.utils.qdrant_client import (
+    get_qdrant_client,
+    get_user_collection_name,
+    get_shared_collection_name,
+    collection_registry,
+    create_collection_if_not_exists,
+    get_collection_vector_size
+)
+
+
+def migrate_user(user_id: str, batch_size: int, drop_source: bool) -> int:
+    """
+    Copy one user's collection into its shared collection
+    
+    Args:
+        user_id: User ID
+        batch_size: Points read and written per request
+        drop_source: Delete the per-user collection after a verified copy
+    
+    Returns:
+        Number of points copied (0 if the user has no collection)
+    """
+    client = get_qdrant_client()
+    source = get_user_collection_name(user_id)
+    target = get_shared_collection_name(user_id)
+    
+    vector_size = get_collection_vector_size(source)
+    if vector_size is None:
+        return 0
+    
+    create_collection_if_not_exists(target, vector_size, multitenant=True)
+    target_size = get_collection_vector_size(target)
+    if target_size != vector_size:
+        raise ValueError(f"{source} has vector size {vector_size} but {target} has {target_size}; re-index first")
+    
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        
+        if records:
+            client.upsert(
+                collection_name=target,
+                points=[
+                    PointStruct(id=record.id, vector=record.vector, payload={**record.payload, "user_id": user_id})
+                    for record in records
+                ]
+            )
+            copied += len(records)
+        
+        if offset is None:
+            break
+    
+    # Verify before repointing documents or dropping anything
+    source_count = client.count(collection_name=source, exact=True).count
+    target_count = client.count(
+        collection_name=target,
+        count_filter=Filter(must=[FieldCondition(key="user_id", match=MatchValue(value=user_id))]),
+        exact=True
+    ).count
+    if target_count < source_count:
+        raise ValueError(f"Only {target_count} of {source_count} points found in {target} for user {user_id}")
+    
+    db = SessionLocal()
+    try:
+        db.query(Document).filter(
+            Document.user_id == uuid.UUID(user_id),
+            Document.vector_collection_id == source
+        ).update({Document.vector_collection_id: target}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    
+    if drop_source:
+        client.delete_collection(collection_name=source)
+        collection_registry.forget(source)
+    
+    return copied
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move per-user collections into the shared collection")
+    parser.add_argument("--user-id", help="Only migrate this user's collection")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points copied per request")
+    parser.add_argument("--drop-source", action="store_true", help="Delete each per-user collection once copied")
+    args = parser.parse_args()
+    
+    if args.user_id:
+        user_ids = [args.user_id]
+    else:
+        db = SessionLocal()
+        try:
+            user_ids = [str(user_id) for (user_id,) in db.query(User.id).all()]
+        finally:
+            db.close()
+    
+    migrated = 0
+    failed = 0
+    for user_id in user_ids:
+        try:
+            count = migrate_user(user_id, args.batch_size, args.drop_source)
+        except Exception as e:
+            failed += 1
+            print(f"User {user_id}: failed: {e}")
+            continue
+        
+        if count:
+            migrated += 1
+            print(f"User {user_id}: {count} points -> {get_shared_collection_name(user_id)}")
+    
+    print(f"Migrated {migrated} collections, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
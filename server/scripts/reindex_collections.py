@@ -0,0 +1,49 @@
+"""
+Re-index Collections
+Re-embed every user collection whose vector size differs from the current
+embedding dimension (e.g. after changing EMBEDDING_DIMENSIONS or EMBEDDING_PROVIDER)
+
+Safe to re-run: an interrupted re-index is resumed from its temporary
+<collection>_reindex collection.
+
+Usage (from server/):
+    python -m scripts.reindex_collections
+    python -m scripts.reindex_collections --user-id <uuid>
+"""
+
+import argparse
+
+from app.database import SessionLocal
+from app.models.user import User
+from app.services.qdrant_service import QdrantService
+from app.utils.embeddings import get_embedding_dimension
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-embed collections at the current embedding dimension")
+    parser.add_argument("--user-id", help="Only re-index this user's collection")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points re-embedded per request")
+    args = parser.parse_args()
+    
+    if args.user_id:
+        user_ids = [args.user_id]
+    else:
+        db = SessionLocal()
+        try:
+            user_ids = [str(user_id) for (user_id,) in db.query(User.id).all()]
+        finally:
+            db.close()
+    
+    dimension = get_embedding_dimension()
+    print(f"Target dimension: {dimension}")
+    
+    for user_id in user_ids:
+        # Called for every user so that interrupted runs are resumed too
+        current = QdrantService.get_collection_dimension(user_id)
+        count = QdrantService.reindex_user_collection(user_id, batch_size=args.batch_size)
+        if count:
+            print(f"User {user_id} ({current} -> {dimension}): {count} points re-indexed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Upgrade Collections
+Apply the active collection profile (QDRANT_COLLECTION_PROFILE) to existing
+collections: payload indexes, HNSW parameters, on-disk vectors and quantization
+
+Usage (from server/):
+    python -m scripts.upgrade_collections
+    python -m scripts.upgrade_collections --collection user_<uuid>_documents
+"""
+
+import argparse
+import re
+
+from app.config import settings
+from app.utils.qdrant_client import get_qdrant_client, apply_collection_profile
+
+
+USER_COLLECTION_PATTERN = re.compile(r"^user_.+_documents$")
+
+
+def is_managed_collection(collection_name: str) -> tuple[bool, bool]:
+    """
+    Check whether a collection belongs to this application
+    
+    Args:
+        collection_name: Name of the collection
+    
+    Returns:
+        Tuple of (managed, multitenant)
+    """
+    shared = settings.QDRANT_SHARED_COLLECTION
+    if collection_name == shared or re.fullmatch(rf"{re.escape(shared)}_\d+", collection_name):
+        return True, True
+    if USER_COLLECTION_PATTERN.match(collection_name):
+        return True, False
+    return False, False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply the collection profile to existing collections")
+    parser.add_argument("--collection", help="Only upgrade this collection")
+    args = parser.parse_args()
+    
+    if args.collection:
+        collection_names = [args.collection]
+    else:
+        collection_names = [col.name for col in get_qdrant_client().get_collections().collections]
+    
+    print(f"Profile: {settings.QDRANT_COLLECTION_PROFILE}")
+    
+    upgraded = 0
+    failed = 0
+    for collection_name in collection_names:
+        managed, multitenant = is_managed_collection(collection_name)
+        if not managed and not args.collection:
+            continue
+        
+        try:
+            apply_collection_profile(collection_name, multitenant=multitenant)
+        except Exception as e:
+            failed += 1
+            print(f"{collection_name}: failed: {e}")
+            continue
+        
+        upgraded += 1
+        print(f"{collection_name}: upgraded")
+    
+    print(f"Upgraded {upgraded} collections, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
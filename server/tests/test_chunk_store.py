@@ -0,0 +1,198 @@
+"""
+Tests for chunk text kept in the chunk store instead of the Qdrant payload
+"""
+
+import os
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from app.config import settings
+from app.services import qdrant_service
+from app.services.qdrant_service import QdrantService
+from app.utils import chunk_store
+from app.utils import qdrant_client as qdrant_utils
+from app.utils.qdrant_client import collection_registry, create_collection, get_chunk_point_id, get_collection_name
+
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+OTHER_USER_ID = "00000000-0000-0000-0000-000000000002"
+SOURCE_DOCUMENT_ID = UUID("00000000-0000-0000-0000-0000000000d1")
+TARGET_DOCUMENT_ID = UUID("00000000-0000-0000-0000-0000000000d2")
+
+
+def hit(point_id, payload, score=0.5):
+    return SimpleNamespace(id=point_id, payload=payload, score=score)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """In-memory chunk store keyed by point ID"""
+    rows = {}
+    requested = []
+    
+    def get_chunks(point_ids):
+        requested.append(list(point_ids))
+        return {point_id: rows[point_id] for point_id in point_ids if point_id in rows}
+    
+    def store_chunks(new_rows):
+        for point_id, document_id, chunk_index, text in new_rows:
+            rows[str(point_id)] = {"chunk_text": text, "filename": f"{document_id}.txt"}
+    
+    monkeypatch.setattr(settings, "CHUNK_TEXT_STORE", "postgres")
+    monkeypatch.setattr(chunk_store, "get_chunks", get_chunks)
+    monkeypatch.setattr(chunk_store, "store_chunks", store_chunks)
+    return SimpleNamespace(rows=rows, requested=requested)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_utils, "_client", client)
+    monkeypatch.setattr(qdrant_utils, "_client_pid", os.getpid())
+    monkeypatch.setattr(qdrant_service, "get_embedding_dimension", lambda: 4)
+    collection_registry.clear()
+    yield client
+    collection_registry.clear()
+
+
+def test_compression_round_trip(monkeypatch):
+    text = "naïve café " * 100
+    for level in (1, 9):
+        monkeypatch.setattr(settings, "CHUNK_STORE_COMPRESSION_LEVEL", level)
+        compressed = chunk_store.compress_text(text)
+        assert len(compressed) < len(text.encode("utf-8"))
+        assert chunk_store.decompress_text(compressed) == text
+
+
+def test_empty_requests_skip_the_database(monkeypatch):
+    def no_session():
+        raise AssertionError("database opened")
+    
+    monkeypatch.setattr(chunk_store, "SessionLocal", no_session)
+    assert chunk_store.get_chunks([]) == {}
+    chunk_store.store_chunks([])
+
+
+def test_payload_keeps_only_search_fields(monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_TEXT_STORE", "postgres")
+    monkeypatch.setattr(settings, "QDRANT_COLLECTION_LAYOUT", "per_user")
+    assert QdrantService._chunk_payload(USER_ID, SOURCE_DOCUMENT_ID, 3, "text", 7, "a.txt") == {
+        "document_id": str(SOURCE_DOCUMENT_ID),
+        "chunk_index": 3,
+        "token_count": 7
+    }
+    
+    monkeypatch.setattr(settings, "CHUNK_TEXT_STORE", "payload")
+    payload = QdrantService._chunk_payload(USER_ID, SOURCE_DOCUMENT_ID, 3, "text", 7, "a.txt")
+    assert payload["chunk_text"] == "text"
+    assert payload["filename"] == "a.txt"
+
+
+def test_results_are_hydrated_from_the_store(store):
+    store.rows["p1"] = {"chunk_text": "stored text", "filename": "stored.pdf"}
+    results = QdrantService._format_document_results([
+        hit("p1", {"document_id": "d1", "chunk_index": 0, "token_count": 3}, score=0.9),
+        hit("p2", {"document_id": "d2", "chunk_index": 4, "chunk_text": "legacy text", "filename": "legacy.pdf"}, score=0.8)
+    ])
+    
+    assert results == [
+        {
+            "document_id": "d1",
+            "filename": "stored.pdf",
+            "chunk_index": 0,
+            "chunk_text": "stored text",
+            "token_count": 3,
+            "similarity_score": 0.9
+        },
+        {
+            "document_id": "d2",
+            "filename": "legacy.pdf",
+            "chunk_index": 4,
+            "chunk_text": "legacy text",
+            "token_count": None,
+            "similarity_score": 0.8
+        }
+    ]
+    # One lookup, only for the hit without text in its payload
+    assert store.requested == [["p1"]]
+
+
+def test_hits_without_a_stored_row_are_dropped(store):
+    store.rows["p1"] = {"chunk_text": "kept", "filename": "a.txt"}
+    results = QdrantService._format_document_results([
+        hit("p1", {"document_id": "d1", "chunk_index": 0}),
+        hit("p2", {"document_id": "d1", "chunk_index": 1})
+    ])
+    assert [result["chunk_text"] for result in results] == ["kept"]
+
+
+def test_texts_are_loaded_from_payload_or_store(store):
+    store.rows["p3"] = {"chunk_text": "stored", "filename": "a.txt"}
+    texts = QdrantService._load_texts([
+        hit("p1", {"chunk_text": "legacy chunk"}),
+        hit("p2", {"text": "chat message"}),
+        hit("p3", {"chunk_index": 0}),
+        hit("p4", {"chunk_index": 1})
+    ])
+    assert texts == ["legacy chunk", "chat message", "stored", ""]
+    assert store.requested == [["p3", "p4"]]
+
+
+def test_duplicate_copy_stores_text_for_the_new_document(store, client, monkeypatch):
+    monkeypatch.setattr(settings, "QDRANT_COLLECTION_LAYOUT", "per_user")
+    create_collection(get_collection_name(USER_ID), 4)
+    points = []
+    for chunk_index in range(3):
+        point_id = get_chunk_point_id(SOURCE_DOCUMENT_ID, chunk_index)
+        store.rows[point_id] = {"chunk_text": f"chunk {chunk_index}", "filename": "source.txt"}
+        points.append(PointStruct(
+            id=point_id,
+            vector=[1.0, 0.0, 0.0, float(chunk_index)],
+            payload=QdrantService._chunk_payload(USER_ID, SOURCE_DOCUMENT_ID, chunk_index, "", 2, "source.txt")
+        ))
+    client.upsert(collection_name=get_collection_name(USER_ID), points=points)
+    
+    copied = QdrantService.copy_document_embeddings(
+        USER_ID, SOURCE_DOCUMENT_ID, OTHER_USER_ID, TARGET_DOCUMENT_ID, "copy.txt", batch_size=2
+    )
+    
+    assert copied == 3
+    for chunk_index in range(3):
+        point_id = get_chunk_point_id(TARGET_DOCUMENT_ID, chunk_index)
+        assert store.rows[point_id]["chunk_text"] == f"chunk {chunk_index}"
+        record = client.retrieve(get_collection_name(OTHER_USER_ID), [point_id])[0]
+        assert record.payload == {"document_id": str(TARGET_DOCUMENT_ID), "chunk_index": chunk_index, "token_count": 2}
+
+
+def test_reindex_embeds_stored_texts(store, client, monkeypatch):
+    create_collection(get_collection_name(USER_ID), 2)
+    client.upsert(
+        collection_name=get_collection_name(USER_ID),
+        points=[
+            PointStruct(
+                id=get_chunk_point_id(SOURCE_DOCUMENT_ID, 0),
+                vector=[1.0, 0.0],
+                payload={"document_id": str(SOURCE_DOCUMENT_ID), "chunk_index": 0}
+            ),
+            PointStruct(
+                id=get_chunk_point_id(SOURCE_DOCUMENT_ID, 1),
+                vector=[0.0, 1.0],
+                payload={"document_id": str(SOURCE_DOCUMENT_ID), "chunk_index": 1, "chunk_text": "legacy"}
+            )
+        ]
+    )
+    store.rows[get_chunk_point_id(SOURCE_DOCUMENT_ID, 0)] = {"chunk_text": "stored", "filename": "a.txt"}
+    embedded = []
+    
+    def generate_embeddings(texts, token_counts=None):
+        embedded.extend(texts)
+        return [[1.0] * 4 for _ in texts]
+    
+    monkeypatch.setattr(qdrant_service, "generate_embeddings", generate_embeddings)
+    
+    assert QdrantService.reindex_user_collection(USER_ID) == 2
+    assert sorted(embedded) == ["legacy", "stored"]
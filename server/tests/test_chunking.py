@@ -0,0 +1,94 @@
+"""
+Tests for the text chunkers
+"""
+
+import random
+
+import pytest
+import tiktoken
+
+from app.config import settings
+from app.utils import file_parser
+from app.utils.file_parser import chunk_text, iter_chunks, iter_document_chunks, iter_token_chunks
+from benchmarks.chunking_benchmark import build_corpus, legacy_chunk_text
+
+
+# Overlap must stay below chunk_size - 100, or the original algorithm never ends
+CHUNK_PARAMETERS = [(1000, 200), (500, 0), (300, 150), (150, 20), (1200, 1000)]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    segments = build_corpus(1)[:40]
+    # Edge cases: leading/trailing whitespace and text without any boundary
+    return ["  \n", *segments, "y" * 3000, "\n\n  "]
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", CHUNK_PARAMETERS)
+def test_chunk_text_matches_original_algorithm(corpus, chunk_size, chunk_overlap):
+    text = "".join(corpus)
+    
+    assert chunk_text(text, chunk_size, chunk_overlap) == legacy_chunk_text(text, chunk_size, chunk_overlap)
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", CHUNK_PARAMETERS)
+def test_streamed_segments_chunk_like_the_whole_text(corpus, chunk_size, chunk_overlap):
+    text = "".join(corpus)
+    rng = random.Random(chunk_size)
+    cuts = sorted(rng.sample(range(1, len(text)), 500))
+    segments = [text[start:end] for start, end in zip([0, *cuts], [*cuts, len(text)])]
+    
+    assert list(iter_chunks(segments, chunk_size, chunk_overlap, strip=False)) == legacy_chunk_text(text, chunk_size, chunk_overlap)
+    assert list(iter_chunks(segments, chunk_size, chunk_overlap)) == legacy_chunk_text(text.strip(), chunk_size, chunk_overlap)
+
+
+def test_empty_input_has_no_chunks():
+    assert chunk_text("") == []
+    assert list(iter_chunks(["", "  \n "])) == []
+
+
+@pytest.mark.parametrize("filename, content", [
+    ("notes.txt", "First sentence. Second sentence.\n" * 100),
+    ("rows.csv", "id,text\n" + "".join(f"{i},row {i}\n" for i in range(300))),
+])
+def test_local_character_chunking_does_not_tokenize(tmp_path, monkeypatch, filename, content):
+    def count_tokens(text):
+        raise AssertionError("tokenizer used")
+    
+    monkeypatch.setattr(file_parser, "count_tokens", count_tokens)
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(settings, "CHUNK_UNIT", "characters")
+    monkeypatch.setattr(settings, "TEXT_CACHE_ENABLED", False)
+    path = tmp_path / filename
+    path.write_text(content)
+    
+    chunks = list(iter_document_chunks(str(path)))
+    
+    assert len(chunks) > 1
+    assert all(token_count is None for _, token_count in chunks)
+
+
+@pytest.fixture
+def byte_tokenizer(monkeypatch):
+    """One token per byte, so multi-byte characters span several tokens (and no download is needed)"""
+    tokenizer = tiktoken.Encoding(
+        name="bytes",
+        pat_str=r"\s+|\S+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={}
+    )
+    monkeypatch.setattr(file_parser, "get_tokenizer", lambda: tokenizer)
+    return tokenizer
+
+
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(7, 2), (16, 4), (33, 0)])
+def test_token_chunks_keep_multibyte_characters_whole(byte_tokenizer, chunk_size, chunk_overlap):
+    text = "東京は日本の首都です。🙂🚀 Ünïcödé façade — naïve café! " * 20
+    
+    chunks = list(iter_token_chunks([text], chunk_size, chunk_overlap))
+    
+    assert len(chunks) > 1
+    for chunk, token_count in chunks:
+        assert "\ufffd" not in chunk
+        assert chunk == chunk.strip()
+        assert token_count == len(byte_tokenizer.encode(chunk)) <= chunk_size
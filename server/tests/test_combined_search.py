@@ -0,0 +1,82 @@
+"""
+Tests for searching documents and chat history in one request
+"""
+
+import os
+from uuid import UUID
+
+import pytest
+from qdrant_client import QdrantClient
+
+from app.config import settings
+from app.services import qdrant_service
+from app.services.qdrant_service import QdrantService
+from app.utils import qdrant_client as qdrant_utils
+from app.utils.qdrant_client import collection_registry
+
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+DOCUMENT_ID = UUID("00000000-0000-0000-0000-0000000000d1")
+QUERY = [1.0, 0.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_utils, "_client", client)
+    monkeypatch.setattr(qdrant_utils, "_client_pid", os.getpid())
+    monkeypatch.setattr(qdrant_service, "get_embedding_dimension", lambda: 4)
+    monkeypatch.setattr(settings, "QDRANT_COLLECTION_LAYOUT", "per_user")
+    monkeypatch.setattr(settings, "CHUNK_TEXT_STORE", "payload")
+    collection_registry.clear()
+    yield client
+    collection_registry.clear()
+
+
+def store_chats(count, vector):
+    for i in range(count):
+        QdrantService.store_chat_history_embedding(USER_ID, UUID(int=i + 1), f"chat {i}", vector)
+
+
+def test_both_quotas_are_filled_when_documents_dominate(client):
+    # 50 chunks closer to the query than any chat message
+    QdrantService.store_document_embeddings(
+        USER_ID,
+        DOCUMENT_ID,
+        [f"chunk {i}" for i in range(50)],
+        [[1.0, 0.0, 0.0, 0.001 * i] for i in range(50)],
+        "doc.txt"
+    )
+    store_chats(5, [0.1, 1.0, 0.0, 0.0])
+    
+    results = QdrantService.search_combined(USER_ID, QUERY, limit=10)
+    
+    assert len(results["document_results"]) == 7
+    assert len(results["chat_results"]) == 3
+    assert [result["chunk_index"] for result in results["document_results"]] == list(range(7))
+
+
+def test_both_quotas_are_filled_when_chats_dominate(client):
+    store_chats(20, QUERY)
+    QdrantService.store_document_embeddings(
+        USER_ID,
+        DOCUMENT_ID,
+        [f"chunk {i}" for i in range(10)],
+        [[0.1, 1.0, 0.0, 0.0]] * 10,
+        "doc.txt"
+    )
+    
+    results = QdrantService.search_combined(USER_ID, QUERY, limit=10, document_weight=0.5, chat_weight=0.5)
+    
+    assert len(results["document_results"]) == 5
+    assert len(results["chat_results"]) == 5
+    assert all(result["text"].startswith("chat") for result in results["chat_results"])
+
+
+def test_missing_type_leaves_the_other_quota_unchanged(client):
+    store_chats(5, QUERY)
+    
+    results = QdrantService.search_combined(USER_ID, QUERY, limit=10)
+    
+    assert results["document_results"] == []
+    assert len(results["chat_results"]) == 3
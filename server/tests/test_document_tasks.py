@@ -0,0 +1,41 @@
+"""
+Tests for document processing task helpers
+"""
+
+import httpx
+from openai import BadRequestError, InternalServerError, RateLimitError
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from app.tasks.document_tasks import _is_transient_error
+
+
+def openai_error(error_class, status_code):
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    response = httpx.Response(status_code, request=request)
+    return error_class("error", response=response, body=None)
+
+
+def wrapped(error):
+    """Raise error and wrap it the way the services do"""
+    try:
+        try:
+            raise error
+        except Exception as e:
+            raise ValueError(f"Error generating embeddings: {str(e)}")
+    except ValueError as e:
+        return e
+
+
+def test_transient_errors_are_retried():
+    assert _is_transient_error(wrapped(openai_error(RateLimitError, 429)))
+    assert _is_transient_error(wrapped(openai_error(InternalServerError, 503)))
+    assert _is_transient_error(wrapped(httpx.ConnectTimeout("timed out")))
+    assert _is_transient_error(wrapped(ResponseHandlingException(ConnectionRefusedError())))
+    assert _is_transient_error(UnexpectedResponse(502, "Bad Gateway", b"", httpx.Headers()))
+
+
+def test_permanent_errors_are_not_retried():
+    assert not _is_transient_error(ValueError("No text extracted from document"))
+    assert not _is_transient_error(wrapped(ValueError("Error parsing PDF: EOF marker not found")))
+    assert not _is_transient_error(wrapped(openai_error(BadRequestError, 400)))
+    assert not _is_transient_error(UnexpectedResponse(400, "Bad Request", b"wrong vector dimension", httpx.Headers()))
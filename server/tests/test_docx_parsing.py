@@ -0,0 +1,59 @@
+"""
+Tests for DOCX extraction
+"""
+
+import zipfile
+
+from app.utils.file_parser import FileParser
+
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def write_docx(path, body):
+    """Write a DOCX archive holding only word/document.xml"""
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document {W}><w:body>{body}</w:body></w:document>')
+
+
+def paragraph(*runs):
+    return "<w:p>" + "".join(f"<w:r>{run}</w:r>" for run in runs) + "</w:p>"
+
+
+def cell(*content):
+    return "<w:tc>" + "".join(content) + "</w:tc>"
+
+
+def test_paragraphs_runs_tabs_and_breaks(tmp_path):
+    path = tmp_path / "doc.docx"
+    write_docx(path, (
+        # The tab stop definition in the paragraph properties is not text
+        '<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr>'
+        "<w:r><w:t>Title</w:t></w:r></w:p>"
+        + paragraph("<w:t>Hello</w:t>", "<w:tab/><w:t>world</w:t>", "<w:br/><w:t>again</w:t>")
+        + paragraph()
+    ))
+    
+    assert list(FileParser.iter_docx_blocks(str(path))) == ["Title", "Hello\tworld\nagain", ""]
+    assert FileParser.parse_docx(str(path)) == "Title\nHello\tworld\nagain"
+
+
+def test_table_rows_with_nested_table(tmp_path):
+    path = tmp_path / "doc.docx"
+    nested = "<w:tbl><w:tr>" + cell(paragraph("<w:t>inner a</w:t>")) + cell(paragraph("<w:t>inner b</w:t>")) + "</w:tr></w:tbl>"
+    write_docx(path, (
+        paragraph("<w:t>Before</w:t>")
+        + "<w:tbl>"
+        + "<w:tr>" + cell(paragraph("<w:t>Name</w:t>")) + cell(paragraph("<w:t>Notes</w:t>")) + "</w:tr>"
+        + "<w:tr>" + cell(paragraph("<w:t>Ada</w:t>")) + cell(paragraph("<w:t>see</w:t>"), nested) + "</w:tr>"
+        + "<w:tr>" + cell(paragraph()) + cell(paragraph()) + "</w:tr>"
+        + "</w:tbl>"
+        + paragraph("<w:t>After</w:t>")
+    ))
+    
+    assert list(FileParser.iter_docx_blocks(str(path))) == [
+        "Before",
+        "Name | Notes",
+        "Ada | see inner a | inner b",
+        "After",
+    ]
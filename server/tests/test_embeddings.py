@@ -0,0 +1,124 @@
+"""
+Tests for embedding batching, caching and retries
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from app.config import settings
+from app.utils import embeddings
+from app.utils.embedding_cache import EmbeddingCache, get_cache_key
+from app.utils.embedding_providers import OpenAIEmbeddingProvider
+from app.utils.embeddings import _collect_missing, _embed_batch, _fill_missing, _plan_batches
+
+
+@pytest.fixture
+def request_limits(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_REQUEST_MAX_INPUTS", 3)
+    monkeypatch.setattr(settings, "EMBEDDING_REQUEST_MAX_TOKENS", 100)
+
+
+def test_batches_cover_inputs_in_order(request_limits):
+    token_counts = [10, 20, 30, 40, 50, 5, 5, 5, 5, 90, 20]
+    
+    batches = _plan_batches(token_counts)
+    
+    assert batches == [(0, 3), (3, 6), (6, 9), (9, 10), (10, 11)]
+    # Consecutive, gap-free ranges within both limits
+    assert [start for start, _ in batches[1:]] == [end for _, end in batches[:-1]]
+    for start, end in batches:
+        assert end - start <= 3
+        assert sum(token_counts[start:end]) <= 100
+
+
+def test_oversized_input_gets_a_batch_of_its_own(request_limits):
+    assert _plan_batches([10, 500, 10]) == [(0, 1), (1, 2), (2, 3)]
+    assert _plan_batches([]) == [(0, 0)]
+
+
+def test_duplicate_misses_are_embedded_once_and_filled_in_order():
+    texts = ["a", "b", "a", "c"]
+    keys = [get_cache_key(text, "model", 2) for text in texts]
+    cached = [None, [0.5, 0.5], None, None]
+    
+    missing_keys, missing_texts, missing_counts = _collect_missing(texts, [1, 2, 1, 3], keys, cached)
+    
+    assert missing_texts == ["a", "c"]
+    assert missing_counts == [1, 3]
+    vectors = {key: [float(i), 0.0] for i, key in enumerate(missing_keys)}
+    assert _fill_missing(keys, cached, vectors) == [[0.0, 0.0], [0.5, 0.5], [0.0, 0.0], [1.0, 0.0]]
+
+
+def test_memory_cache_evicts_least_recently_used():
+    # Each 2-float vector packs to 8 bytes: room for three entries
+    cache = EmbeddingCache("memory", memory_bytes=24, ttl=60)
+    cache.set_many({"a": [1.0, 1.0], "b": [2.0, 2.0], "c": [3.0, 3.0]})
+    
+    assert cache.get_many(["a"]) == [[1.0, 1.0]]
+    cache.set_many({"d": [4.0, 4.0]})
+    
+    assert cache.get_many(["a", "b", "c", "d"]) == [[1.0, 1.0], None, [3.0, 3.0], [4.0, 4.0]]
+    assert cache._size == 24
+
+
+def test_memory_cache_replaces_entries_without_growing():
+    cache = EmbeddingCache("memory", memory_bytes=16, ttl=60)
+    cache.set_many({"a": [1.0, 1.0], "b": [2.0, 2.0]})
+    cache.set_many({"a": [5.0, 5.0]})
+    
+    assert cache.get_many(["a", "b"]) == [[5.0, 5.0], [2.0, 2.0]]
+    assert cache._size == 16
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    return RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+
+
+class FlakyProvider:
+    """Fails with 429 a number of times before answering"""
+    
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+    
+    def embed(self, texts):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise rate_limit_error()
+        return [[float(len(text))] for text in texts]
+
+
+def test_every_attempt_passes_the_rate_limiter(monkeypatch):
+    acquired = []
+    monkeypatch.setattr(embeddings.embedding_rate_limiter, "acquire", lambda tokens=0: acquired.append(tokens))
+    monkeypatch.setattr(embeddings.time, "sleep", lambda seconds: None)
+    provider = FlakyProvider(failures=2)
+    
+    assert _embed_batch(provider, ["a", "bb"], tokens=3) == [[1.0], [2.0]]
+    assert provider.calls == 3
+    assert acquired == [3, 3, 3]
+
+
+def test_openai_clients_leave_retries_to_the_batch_loop():
+    provider = OpenAIEmbeddingProvider("text-embedding-3-small")
+    
+    assert provider.client.max_retries == 0
+
+
+def test_async_client_is_shared_until_closed():
+    provider = OpenAIEmbeddingProvider("text-embedding-3-small")
+    
+    async def run():
+        client, semaphore = provider._get_async_state()
+        assert provider._get_async_state() == (client, semaphore)
+        assert client.max_retries == 0
+        await provider.aclose()
+        return client
+    
+    client = asyncio.run(run())
+    assert client.is_closed()
+    assert provider._async_client is None
@@ -0,0 +1,123 @@
+"""
+Tests for PDF extraction
+"""
+
+import multiprocessing
+import os
+
+import billiard
+import pytest
+
+from app import celery_app as celery_module
+from app.celery_app import celery_app
+from app.config import settings
+from app.utils import file_parser
+from app.utils.file_parser import FileParser
+
+
+def write_pdf(path, page_texts):
+    """Write a minimal PDF with one line of Helvetica text per page"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Pages, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def _parse_in_daemon(file_path, queue):
+    """Parse a PDF the way a Celery prefork child does, recording pool use"""
+    pools = []
+    original_pool = billiard.Pool
+    
+    def recording_pool(*args, **kwargs):
+        pools.append(kwargs.get("processes"))
+        return original_pool(*args, **kwargs)
+    
+    billiard.Pool = recording_pool
+    try:
+        queue.put((list(FileParser.iter_pdf_pages(file_path)), pools))
+    except Exception as e:
+        queue.put((repr(e), pools))
+
+
+def start_worker(concurrency=None):
+    """Build a worker as `celery worker [-c N]` does, which sends worker_init"""
+    celery_app.WorkController(concurrency=concurrency, pool_cls="solo")
+
+
+@pytest.fixture(autouse=True)
+def worker_state(monkeypatch):
+    # Neither the env setting nor an earlier worker may leak into the cap
+    monkeypatch.setattr(celery_module, "_worker_concurrency", 0)
+    monkeypatch.setattr(celery_app.conf, "worker_concurrency", None)
+
+
+@pytest.fixture
+def parallel_settings(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PARALLEL_PAGE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "PDF_PARSE_WORKERS", 0)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    start_worker(concurrency=2)
+
+
+def test_pdf_pages_in_order(tmp_path):
+    path = tmp_path / "doc.pdf"
+    write_pdf(path, [f"Page {i}" for i in range(3)])
+    
+    pages = list(FileParser.iter_pdf_pages(str(path)))
+    
+    assert [page.strip() for page in pages] == ["Page 0", "Page 1", "Page 2"]
+
+
+def test_parallel_extraction_runs_inside_daemon_process(tmp_path, parallel_settings):
+    path = tmp_path / "doc.pdf"
+    texts = [f"Page {i}" for i in range(12)]
+    write_pdf(path, texts)
+    
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=_parse_in_daemon, args=(str(path), queue), daemon=True)
+    process.start()
+    pages, pools = queue.get(timeout=60)
+    process.join(timeout=10)
+    
+    assert pools == [2]
+    assert [page.strip() for page in pages] == texts
+
+
+def test_workers_capped_by_the_running_worker_pool_size(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PARSE_WORKERS", 0)
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(multiprocessing.current_process(), "daemon", True, raising=False)
+    
+    # celery worker -c 2 leaves worker_concurrency unset in the config
+    start_worker(concurrency=2)
+    assert celery_app.conf.worker_concurrency is None
+    assert file_parser._pdf_parse_workers() == 4
+    
+    # Default pool: one process per CPU
+    start_worker()
+    assert file_parser._pdf_parse_workers() == 1
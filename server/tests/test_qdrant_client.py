@@ -0,0 +1,26 @@
+"""
+Tests for Qdrant naming helpers
+"""
+
+import uuid
+
+from app.utils.qdrant_client import get_chunk_point_id
+
+
+DOCUMENT_ID = uuid.UUID("3f1c2a9e-8d4b-4e6f-9a7c-1b2d3e4f5a6b")
+
+
+def test_chunk_point_id_is_stable():
+    point_id = get_chunk_point_id(DOCUMENT_ID, 7)
+    
+    # Fixed value: changing the derivation would orphan every stored chunk
+    assert point_id == "251ec3e0-5a4f-5d8d-b568-d5008d5410de"
+    assert point_id == get_chunk_point_id(str(DOCUMENT_ID), 7)
+    assert uuid.UUID(point_id).version == 5
+
+
+def test_chunk_point_ids_are_distinct():
+    other_document = uuid.UUID("3f1c2a9e-8d4b-4e6f-9a7c-1b2d3e4f5a6c")
+    ids = {get_chunk_point_id(document_id, i) for document_id in (DOCUMENT_ID, other_document) for i in range(100)}
+    
+    assert len(ids) == 200
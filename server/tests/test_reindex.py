@@ -0,0 +1,88 @@
+"""
+Tests for re-indexing a collection at a new embedding dimension
+"""
+
+import os
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from app.services import qdrant_service
+from app.services.qdrant_service import QdrantService
+from app.utils import qdrant_client as qdrant_utils
+from app.utils.qdrant_client import collection_registry, create_collection, get_collection_name
+
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+POINTS = 10
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_utils, "_client", client)
+    monkeypatch.setattr(qdrant_utils, "_client_pid", os.getpid())
+    monkeypatch.setattr(qdrant_service, "get_embedding_dimension", lambda: 8)
+    collection_registry.clear()
+    
+    create_collection(get_collection_name(USER_ID), 4)
+    client.upsert(
+        collection_name=get_collection_name(USER_ID),
+        points=[
+            PointStruct(id=i, vector=[1.0, 0.0, 0.0, float(i)], payload={"chunk_text": f"chunk {i}", "chunk_index": i})
+            for i in range(POINTS)
+        ]
+    )
+    yield client
+    collection_registry.clear()
+
+
+def embed(calls, fail_on=None):
+    def generate_embeddings(texts, token_counts=None):
+        calls.append(len(texts))
+        if len(calls) == fail_on:
+            raise RuntimeError("embedding service unavailable")
+        return [[1.0] * 8 for _ in texts]
+    return generate_embeddings
+
+
+def test_interrupted_reembedding_is_resumed(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(qdrant_service, "generate_embeddings", embed(calls, fail_on=2))
+    
+    with pytest.raises(ValueError):
+        QdrantService.reindex_user_collection(USER_ID, batch_size=4)
+    
+    # The original is untouched until every point is re-embedded
+    assert QdrantService.get_collection_dimension(USER_ID) == 4
+    
+    assert QdrantService.reindex_user_collection(USER_ID, batch_size=4) == POINTS
+    assert calls == [4, 4, 4, 2]
+    assert QdrantService.get_collection_dimension(USER_ID) == 8
+    assert client.count(get_collection_name(USER_ID), exact=True).count == POINTS
+    assert f"{get_collection_name(USER_ID)}_reindex" not in [c.name for c in client.get_collections().collections]
+
+
+def test_interrupted_copy_back_is_resumed(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(qdrant_service, "generate_embeddings", embed(calls))
+    original_upsert = client.upsert
+    
+    def failing_upsert(collection_name, points, **kwargs):
+        if collection_name == get_collection_name(USER_ID):
+            raise RuntimeError("connection reset")
+        return original_upsert(collection_name=collection_name, points=points, **kwargs)
+    
+    monkeypatch.setattr(client, "upsert", failing_upsert)
+    with pytest.raises(ValueError):
+        QdrantService.reindex_user_collection(USER_ID, batch_size=4)
+    monkeypatch.setattr(client, "upsert", original_upsert)
+    
+    # The live collection is empty, but the data survived in the temporary one
+    assert client.count(get_collection_name(USER_ID), exact=True).count == 0
+    
+    assert QdrantService.reindex_user_collection(USER_ID, batch_size=4) == POINTS
+    assert client.count(get_collection_name(USER_ID), exact=True).count == POINTS
+    assert sum(calls) == POINTS
+    assert QdrantService.reindex_user_collection(USER_ID, batch_size=4) == 0
@@ -0,0 +1,128 @@
+"""
+Tests for coalescing concurrent embedding requests
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.config import settings
+from app.utils import embeddings
+from app.utils.embeddings import _single_flight, generate_embeddings, generate_embeddings_async
+
+
+class SlowProvider:
+    """Remote-style provider that takes `delay` seconds per request"""
+    
+    name = "slow"
+    dimension = 2
+    remote = True
+    
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+    
+    def _result(self, texts):
+        if self.error:
+            raise self.error
+        return [[float(len(text)), 1.0] for text in texts]
+    
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return self._result(texts)
+    
+    async def embed_async(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.delay)
+        return self._result(texts)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = SlowProvider()
+    monkeypatch.setattr(embeddings, "get_embedding_provider", lambda: provider)
+    monkeypatch.setattr(embeddings.embedding_cache, "backend", "none")
+    monkeypatch.setattr(settings, "EMBEDDING_SINGLE_FLIGHT", "process")
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_RETRIES", 0)
+    yield provider
+    assert not _single_flight._futures
+
+
+def embed_in_thread(results, text):
+    try:
+        results.append(generate_embeddings([text], token_counts=[1]))
+    except Exception as e:
+        results.append(e)
+
+
+def test_owner_failure_reaches_waiters_and_releases_the_key(provider):
+    provider.delay = 0.3
+    provider.error = RuntimeError("bad request")
+    results = []
+    owner = threading.Thread(target=embed_in_thread, args=(results, "text"))
+    owner.start()
+    time.sleep(0.1)
+    
+    with pytest.raises(ValueError, match="bad request"):
+        generate_embeddings(["text"], token_counts=[1])
+    owner.join()
+    
+    assert isinstance(results[0], ValueError)
+    assert len(provider.calls) == 1
+    
+    provider.error = None
+    provider.delay = 0
+    assert generate_embeddings(["text"], token_counts=[1]) == [[4.0, 1.0]]
+
+
+def test_cancelled_owner_does_not_strand_waiters(provider):
+    provider.delay = 0.5
+    
+    async def run():
+        owner = asyncio.create_task(generate_embeddings_async(["text"], token_counts=[1]))
+        await asyncio.sleep(0.1)
+        waiter = asyncio.create_task(generate_embeddings_async(["text"], token_counts=[1]))
+        await asyncio.sleep(0.1)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await waiter
+    
+    # The waiter embeds the text itself once the owner is gone
+    assert asyncio.run(run()) == [[4.0, 1.0]]
+    assert len(provider.calls) == 2
+    
+    provider.delay = 0
+    assert generate_embeddings(["text"], token_counts=[1]) == [[4.0, 1.0]]
+
+
+def test_waiter_timeout_embeds_itself_and_owner_still_succeeds(provider, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_SINGLE_FLIGHT_TIMEOUT", 0.2)
+    provider.delay = 0.6
+    
+    async def run():
+        owner = asyncio.create_task(generate_embeddings_async(["text"], token_counts=[1]))
+        await asyncio.sleep(0.1)
+        waiter = await generate_embeddings_async(["text"], token_counts=[1])
+        return await owner, waiter
+    
+    assert asyncio.run(run()) == ([[4.0, 1.0]], [[4.0, 1.0]])
+    assert len(provider.calls) == 2
+
+
+def test_sync_waiter_timeout_embeds_itself(provider, monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_SINGLE_FLIGHT_TIMEOUT", 0.2)
+    provider.delay = 0.6
+    results = []
+    owner = threading.Thread(target=embed_in_thread, args=(results, "text"))
+    owner.start()
+    time.sleep(0.1)
+    
+    assert generate_embeddings(["text"], token_counts=[1]) == [[4.0, 1.0]]
+    owner.join()
+    
+    assert results == [[[4.0, 1.0]]]
@@ -0,0 +1,97 @@
+"""
+Tests for the structured (CSV and JSON) streaming chunkers
+"""
+
+import json
+
+import pytest
+
+from app.utils.file_parser import FileParser
+
+
+def test_csv_chunks_pack_whole_rows_under_the_header(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text('name,quote\nAda,"Hello, world"\n,\nBob,plain\n' + "".join(f"row{i},value {i}\n" for i in range(30)))
+    
+    chunks = list(FileParser.iter_csv_chunks(str(path), chunk_size=120))
+    
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert all(chunk.startswith("name,quote\n") for chunk in chunks)
+    # Values with commas stay quoted and blank rows are dropped
+    assert chunks[0].split("\n")[1:3] == ['Ada,"Hello, world"', "Bob,plain"]
+    rows = [row for chunk in chunks for row in chunk.split("\n")[1:]]
+    assert rows[2:] == [f"row{i},value {i}" for i in range(30)]
+
+
+def test_csv_rows_are_labelled_with_their_headers(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("name,age\nAda,36\nBob,41\n")
+    
+    assert list(FileParser.iter_csv_rows(str(path))) == ["name: Ada, age: 36", "name: Bob, age: 41"]
+
+
+def test_json_lines_are_path_qualified(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps({"users": [{"name": "Ada", "tags": ["x", "y"]}, {"name": None, "active": True}], "count": 2.5}))
+    
+    assert list(FileParser.iter_json_lines(str(path))) == [
+        "users[0].name: Ada",
+        "users[0].tags[0]: x",
+        "users[0].tags[1]: y",
+        "users[1].name: null",
+        "users[1].active: true",
+        "count: 2.5",
+    ]
+
+
+def test_json_chunks_keep_top_level_records_together(tmp_path):
+    path = tmp_path / "data.json"
+    records = [{"id": i, "title": f"title {i}", "body": "lorem ipsum " * 3} for i in range(20)]
+    path.write_text(json.dumps(records))
+    
+    chunks = list(FileParser.iter_json_chunks(str(path), chunk_size=200))
+    
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    for chunk in chunks:
+        ids = {line.split("]")[0] for line in chunk.split("\n")}
+        # Every record in a chunk has all three of its lines there
+        assert all(sum(line.startswith(f"{record_id}]") for line in chunk.split("\n")) == 3 for record_id in ids)
+
+
+def test_invalid_json_raises_value_error(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text('{"a": [1, 2')
+    
+    with pytest.raises(ValueError):
+        list(FileParser.iter_json_lines(str(path)))
+
+
+def test_json_long_value_is_split_with_path_on_every_piece(tmp_path):
+    path = tmp_path / "data.json"
+    text = " ".join(f"word{i}" for i in range(200))
+    path.write_text(json.dumps({"items": [{"id": 1, "body": text}, {"id": 2}]}))
+    
+    chunks = list(FileParser.iter_json_chunks(str(path), chunk_size=100))
+    
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    pieces = [chunk for chunk in chunks if "items[0].body: " in chunk]
+    assert len(pieces) > 1
+    assert all(chunk.startswith("items[0].body: ") for chunk in pieces)
+    assert " ".join(piece[len("items[0].body: "):] for piece in pieces) == text
+    assert "items[0].id: 1" in chunks[0]
+    assert "items[1].id: 2" in chunks[-1]
+
+
+def test_csv_long_row_is_split_under_the_header(tmp_path):
+    path = tmp_path / "data.csv"
+    long_cell = " ".join(f"word{i}" for i in range(200))
+    path.write_text(f"id,notes\n1,short\n2,{long_cell}\n3,short\n")
+    
+    chunks = list(FileParser.iter_csv_chunks(str(path), chunk_size=100))
+    
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert all(chunk.startswith("id,notes\n") for chunk in chunks)
+    assert chunks[0] == "id,notes\n1,short"
+    assert chunks[-1] == "id,notes\n3,short"
+    assert len(chunks) > 3
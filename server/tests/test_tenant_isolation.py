@@ -0,0 +1,87 @@
+"""
+Tests that users sharing a collection only see and delete their own points
+"""
+
+import os
+from uuid import UUID
+
+import pytest
+from qdrant_client import QdrantClient
+
+from app.config import settings
+from app.services import qdrant_service
+from app.services.qdrant_service import QdrantService
+from app.utils import qdrant_client as qdrant_utils
+from app.utils.qdrant_client import collection_registry, get_collection_name
+
+
+ALICE = "00000000-0000-0000-0000-00000000000a"
+BOB = "00000000-0000-0000-0000-00000000000b"
+ALICE_DOCUMENT_ID = UUID("00000000-0000-0000-0000-0000000000a1")
+BOB_DOCUMENT_ID = UUID("00000000-0000-0000-0000-0000000000b1")
+QUERY = [1.0, 0.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_utils, "_client", client)
+    monkeypatch.setattr(qdrant_utils, "_client_pid", os.getpid())
+    monkeypatch.setattr(qdrant_service, "get_embedding_dimension", lambda: 4)
+    monkeypatch.setattr(settings, "QDRANT_COLLECTION_LAYOUT", "shared")
+    monkeypatch.setattr(settings, "QDRANT_SHARED_COLLECTION_SHARDS", 1)
+    monkeypatch.setattr(settings, "CHUNK_TEXT_STORE", "payload")
+    collection_registry.clear()
+    
+    for user_id, document_id in ((ALICE, ALICE_DOCUMENT_ID), (BOB, BOB_DOCUMENT_ID)):
+        QdrantService.store_document_embeddings(
+            user_id,
+            document_id,
+            [f"{user_id} chunk {i}" for i in range(3)],
+            [[1.0, 0.0, 0.0, float(i)] for i in range(3)],
+            f"{user_id}.txt"
+        )
+        QdrantService.store_chat_history_embedding(user_id, document_id, f"{user_id} chat", QUERY)
+    
+    assert get_collection_name(ALICE) == get_collection_name(BOB)
+    yield client
+    collection_registry.clear()
+
+
+def owners(results, key="chunk_text"):
+    return {result[key].split()[0] for result in results}
+
+
+def test_searches_only_return_own_points(client):
+    assert owners(QdrantService.search_similar_chunks(ALICE, QUERY, limit=10)) == {ALICE}
+    assert owners(QdrantService.search_similar_chunks(BOB, QUERY, limit=10)) == {BOB}
+    
+    combined = QdrantService.search_combined(ALICE, QUERY, limit=10)
+    assert owners(combined["document_results"]) == {ALICE}
+    assert owners(combined["chat_results"], key="text") == {ALICE}
+
+
+def test_document_filter_cannot_reach_another_user(client):
+    assert QdrantService.search_similar_chunks(ALICE, QUERY, document_id=str(BOB_DOCUMENT_ID)) == []
+
+
+def test_delete_only_removes_own_points(client):
+    collection_name = get_collection_name(ALICE)
+    QdrantService.delete_document_embeddings(ALICE, BOB_DOCUMENT_ID)
+    assert client.count(collection_name, exact=True).count == 8
+    
+    QdrantService.delete_document_embeddings(ALICE, ALICE_DOCUMENT_ID)
+    assert client.count(collection_name, exact=True).count == 5
+    assert QdrantService.search_similar_chunks(ALICE, QUERY, limit=10) == []
+    assert len(QdrantService.search_similar_chunks(BOB, QUERY, limit=10)) == 3
+
+
+def test_copy_only_reads_the_source_users_points(client):
+    target_document_id = UUID("00000000-0000-0000-0000-0000000000a2")
+    assert QdrantService.copy_document_embeddings(ALICE, BOB_DOCUMENT_ID, ALICE, target_document_id, "copy.txt") == 0
+    assert QdrantService.copy_document_embeddings(BOB, BOB_DOCUMENT_ID, ALICE, target_document_id, "copy.txt") == 3
+    
+    copied = QdrantService.search_similar_chunks(ALICE, QUERY, limit=10, document_id=str(target_document_id))
+    assert len(copied) == 3
+    assert {result["filename"] for result in copied} == {"copy.txt"}
+    assert len(QdrantService.search_similar_chunks(BOB, QUERY, limit=10)) == 3
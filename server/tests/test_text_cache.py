@@ -0,0 +1,88 @@
+"""
+Tests for the extracted text cache
+"""
+
+import os
+import time
+
+import pytest
+
+from app.config import settings
+from app.tasks.document_tasks import _is_transient_error
+from app.utils import text_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TEXT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "TEXT_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "TEXT_CACHE_MAX_SIZE_MB", 0)
+    monkeypatch.setattr(settings, "TEXT_CACHE_MAX_AGE_DAYS", 0)
+    return tmp_path
+
+
+def fill(key, text="text"):
+    return list(text_cache.cached_segments(key, lambda: [text]))
+
+
+def test_remove_entries_deletes_every_version_of_a_hash():
+    fill("ab12-v1.pdf")
+    fill("ab12-v2.pdf")
+    fill("ab34-v2.pdf")
+    
+    assert text_cache.remove_entries("ab12") == 2
+    assert not text_cache.get_cache_path("ab12-v2.pdf").exists()
+    assert text_cache.get_cache_path("ab34-v2.pdf").exists()
+
+
+def test_entries_unused_too_long_are_evicted(monkeypatch):
+    fill("aa-v1.txt")
+    fill("bb-v1.txt")
+    week_ago = time.time() - 7 * 86400
+    os.utime(text_cache.get_cache_path("aa-v1.txt"), (week_ago, week_ago))
+    
+    monkeypatch.setattr(settings, "TEXT_CACHE_MAX_AGE_DAYS", 3)
+    assert text_cache.evict() == 1
+    assert not text_cache.get_cache_path("aa-v1.txt").exists()
+    assert text_cache.get_cache_path("bb-v1.txt").exists()
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_size_limit(monkeypatch):
+    for i, key in enumerate(["aa-v1.txt", "bb-v1.txt", "cc-v1.txt"]):
+        fill(key, os.urandom(300 * 1024).hex())
+        used = time.time() - 100 + i
+        os.utime(text_cache.get_cache_path(key), (used, used))
+    
+    # Reading an entry makes it the most recently used
+    assert fill("aa-v1.txt")
+    
+    monkeypatch.setattr(settings, "TEXT_CACHE_MAX_SIZE_MB", 1)
+    assert text_cache.evict() == 1
+    assert not text_cache.get_cache_path("bb-v1.txt").exists()
+    assert text_cache.get_cache_path("aa-v1.txt").exists()
+
+
+def test_unreadable_entry_is_treated_as_a_miss():
+    path = text_cache.get_cache_path("cc-v1.txt")
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"\x1f\x8b truncated")
+    
+    assert fill("cc-v1.txt", "parsed again") == ["parsed again"]
+    # The entry was rewritten from the fresh parse
+    assert list(text_cache.cached_segments("cc-v1.txt", lambda: ["unused"])) == ["parsed again"]
+
+
+def test_entry_truncated_after_use_raises_a_retryable_error():
+    segments = [f"segment {i} " + os.urandom(64).hex() for i in range(2000)]
+    list(text_cache.cached_segments("dd-v1.txt", lambda: segments))
+    path = text_cache.get_cache_path("dd-v1.txt")
+    path.write_bytes(path.read_bytes()[:len(path.read_bytes()) // 2])
+    
+    read = []
+    with pytest.raises(text_cache.CorruptCacheEntryError) as error:
+        for segment in text_cache.cached_segments("dd-v1.txt", lambda: segments):
+            read.append(segment)
+    
+    assert read and read == segments[:len(read)]
+    assert not path.exists()
+    assert _is_transient_error(error.value)
@@ -0,0 +1,104 @@
+"""
+Tests for streaming uploads to disk and the upload size limit
+"""
+
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import FastAPI, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.middleware.upload_limit import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
+from app.services.document_service import DocumentService
+
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_BLOCK_SIZE", 1000)
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 5000)
+    return tmp_path / USER_ID
+
+
+def save(data: bytes, filename: str = "notes.txt"):
+    return asyncio.run(DocumentService.save_file(UploadFile(file=io.BytesIO(data), filename=filename), USER_ID))
+
+
+def test_file_is_saved_with_size_and_digest(upload_dir):
+    data = bytes(range(256)) * 17
+    
+    file_path, file_size, content_hash = save(data)
+    
+    assert file_path.startswith(str(upload_dir))
+    assert file_path.endswith(".txt")
+    with open(file_path, "rb") as f:
+        assert f.read() == data
+    assert file_size == len(data)
+    assert content_hash == hashlib.sha256(data).hexdigest()
+
+
+def test_file_at_the_limit_is_accepted(upload_dir):
+    _, file_size, _ = save(b"x" * settings.MAX_FILE_SIZE)
+    assert file_size == settings.MAX_FILE_SIZE
+
+
+def test_oversized_file_is_rejected_and_removed(upload_dir):
+    with pytest.raises(HTTPException) as error:
+        save(b"x" * (settings.MAX_FILE_SIZE + 1))
+    
+    assert error.value.status_code == 400
+    assert list(upload_dir.iterdir()) == []
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 5000)
+    received = []
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware)
+    
+    @app.post("/api/upload/")
+    async def upload(file: UploadFile):
+        received.append(len(await file.read()))
+        return {"size": received[-1]}
+    
+    @app.post("/api/chat/")
+    async def chat(file: UploadFile):
+        received.append(len(await file.read()))
+        return {"size": received[-1]}
+    
+    return TestClient(app), received
+
+
+def test_declared_oversized_upload_is_refused_before_the_route(app_client):
+    client, received = app_client
+    
+    response = client.post("/api/upload/", files={"file": ("big.txt", b"x" * (settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD))})
+    
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("File too large")
+    assert received == []
+
+
+def test_upload_within_the_limit_reaches_the_route(app_client):
+    client, received = app_client
+    
+    response = client.post("/api/upload/", files={"file": ("small.txt", b"x" * settings.MAX_FILE_SIZE)})
+    
+    assert response.status_code == 200
+    assert received == [settings.MAX_FILE_SIZE]
+
+
+def test_other_paths_are_not_limited(app_client):
+    client, received = app_client
+    
+    response = client.post("/api/chat/", files={"file": ("big.txt", b"x" * (settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD))})
+    
+    assert response.status_code == 200
+    assert received == [settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD]
@@ -0,0 +1,95 @@
+"""
+Tests for pipelined batch upserts
+"""
+
+import os
+import threading
+import time
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from app.config import settings
+from app.services.qdrant_service import QdrantService
+from app.utils import qdrant_client as qdrant_utils
+from app.utils.qdrant_client import collection_registry, create_collection
+
+
+COLLECTION = "upsert_test"
+POINTS = 50
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_utils, "_client", client)
+    monkeypatch.setattr(qdrant_utils, "_client_pid", os.getpid())
+    monkeypatch.setattr(settings, "QDRANT_UPSERT_BATCH_SIZE", 4)
+    monkeypatch.setattr(settings, "QDRANT_UPSERT_PARALLELISM", 3)
+    collection_registry.clear()
+    create_collection(COLLECTION, 2, multitenant=False)
+    yield client
+    collection_registry.clear()
+
+
+@pytest.fixture
+def tracked(client, monkeypatch):
+    """Record concurrent upserts and how far ahead the points are read"""
+    state = {"in_flight": 0, "max_in_flight": 0, "generated": 0, "stored": 0, "max_ahead": 0}
+    lock = threading.Lock()
+    original_upsert = client.upsert
+    
+    def slow_upsert(collection_name, points, **kwargs):
+        with lock:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        time.sleep(0.02)
+        # The in-memory client is not thread-safe; only the latency overlaps
+        with lock:
+            result = original_upsert(collection_name=collection_name, points=points, **kwargs)
+            state["in_flight"] -= 1
+            state["stored"] += len(points)
+        return result
+    
+    monkeypatch.setattr(client, "upsert", slow_upsert)
+    return state
+
+
+def points(state, count=POINTS):
+    for i in range(count):
+        state["generated"] += 1
+        state["max_ahead"] = max(state["max_ahead"], state["generated"] - state["stored"])
+        yield PointStruct(id=i, vector=[1.0, float(i)])
+
+
+def test_requests_in_flight_are_bounded(client, tracked):
+    assert QdrantService.upsert_points(COLLECTION, points(tracked)) == POINTS
+    assert client.count(COLLECTION, exact=True).count == POINTS
+    
+    assert 1 < tracked["max_in_flight"] <= settings.QDRANT_UPSERT_PARALLELISM
+    # Points are read lazily: at most one full pipeline plus the batch being built
+    assert tracked["max_ahead"] <= (settings.QDRANT_UPSERT_PARALLELISM + 1) * settings.QDRANT_UPSERT_BATCH_SIZE
+
+
+def test_progress_is_reported_after_each_batch(client, tracked):
+    progress = []
+    
+    assert QdrantService.upsert_points(COLLECTION, points(tracked, 10), progress.append) == 10
+    assert progress == [4, 8, 10]
+
+
+def test_failed_batch_is_raised(client, monkeypatch):
+    def failing_upsert(collection_name, points, **kwargs):
+        raise RuntimeError("connection reset")
+    
+    monkeypatch.setattr(client, "upsert", failing_upsert)
+    with pytest.raises(RuntimeError):
+        QdrantService.upsert_points(COLLECTION, (PointStruct(id=i, vector=[1.0, 0.0]) for i in range(10)))
+
+
+def test_parallelism_of_one_sends_sequentially(client, tracked, monkeypatch):
+    monkeypatch.setattr(settings, "QDRANT_UPSERT_PARALLELISM", 1)
+    
+    assert QdrantService.upsert_points(COLLECTION, points(tracked)) == POINTS
+    assert tracked["max_in_flight"] == 1